@@ -0,0 +1,454 @@
+"""
+Benchmark the markdown-to-docx pipeline in generate_docs.py.
+
+Builds deterministic synthetic documents at several scales and times each
+stage separately: process_markdown (parse + render), add_table_from_md,
+add_inline_bold and doc.save, plus the streaming writer on long tables.
+Every case runs in a fresh worker process so its peak RSS is its own.
+
+    python bench_docs.py                     # full suite
+    python bench_docs.py --quick             # skip the largest cases
+    python bench_docs.py --json out.json     # save results
+    python bench_docs.py --compare old.json  # show change vs a saved run
+    python bench_docs.py --import-time       # cold-start import cost only
+    python bench_docs.py --compression       # save size/time per zip preset
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import generate_docs as gd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+def mixed_markdown(num_lines):
+    """Markdown shaped like our packets: headings, lists, notes, small tables."""
+    lines = []
+    i = 0
+    while len(lines) < num_lines:
+        lines += [
+            f"## Section {i}",
+            f"Intro paragraph {i} with **bold terms** and plain text around them.",
+            "",
+            f"- Bullet {i} with **one** bold span",
+            f"- [ ] Checkbox item {i} **owner:** Brad",
+            f"1. Numbered step {i}",
+            f"*Note {i}: figures are estimates*",
+            "",
+            "| Item | Owner | Cost |",
+            "|------|-------|------|",
+            f"| Row {i} | **Brad** | ${i},000 |",
+            f"| Row {i + 1} | Alex | ${i + 1},000 |",
+            "",
+            "---",
+        ]
+        i += 1
+    return "\n".join(lines[:num_lines])
+
+
+def table_rows(num_rows, num_cols=5):
+    header = [f"Column {c}" for c in range(num_cols)]
+    rows = [
+        [f"r{r}c{c} value" for c in range(num_cols)] for r in range(num_rows)
+    ]
+    return header, rows
+
+
+def bullet_lines(num_lines):
+    return [
+        f"Item {i} with **bold** text, more **bold** and a trailing clause"
+        for i in range(num_lines)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------------
+def _peak_rss_kb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def _save(doc):
+    buf = io.BytesIO()
+    _, seconds = _timed(doc.save, buf)
+    return len(buf.getvalue()), seconds
+
+
+def bench_document(num_lines):
+    text = mixed_markdown(num_lines)
+    doc = gd.new_document()
+    _, seconds = _timed(gd.process_markdown, doc, text)
+    size, save_seconds = _save(doc)
+    return {
+        "units": num_lines,
+        "unit": "lines",
+        "stages": {"process_markdown": seconds, "save": save_seconds},
+        "throughput": num_lines / seconds,
+        "output_bytes": size,
+    }
+
+
+def bench_table(num_rows):
+    header, rows = table_rows(num_rows)
+    doc = gd.new_document()
+    _, seconds = _timed(gd.add_table_from_md, doc, header, rows)
+    size, save_seconds = _save(doc)
+    return {
+        "units": num_rows,
+        "unit": "rows",
+        "stages": {"add_table_from_md": seconds, "save": save_seconds},
+        "throughput": num_rows / seconds,
+        "output_bytes": size,
+    }
+
+
+def bench_bullets(num_lines):
+    lines = bullet_lines(num_lines)
+    doc = gd.new_document()
+    ctx = gd.DocxContext(doc)
+    style_id = ctx.styles["List Bullet"]
+    paras = [ctx.add_paragraph(style_id) for _ in lines]
+
+    start = time.perf_counter()
+    for para, line in zip(paras, lines):
+        gd.add_inline_bold(para, line)
+    seconds = time.perf_counter() - start
+
+    size, save_seconds = _save(doc)
+    return {
+        "units": num_lines,
+        "unit": "lines",
+        "stages": {"add_inline_bold": seconds, "save": save_seconds},
+        "throughput": num_lines / seconds,
+        "output_bytes": size,
+    }
+
+
+def table_markdown_lines(num_rows, num_cols=5):
+    """Lines of a pipe table, generated lazily like a large PMS export."""
+    yield "| " + " | ".join(f"Column {c}" for c in range(num_cols)) + " |"
+    yield "|" + "---|" * num_cols
+    for r in range(num_rows):
+        yield "| " + " | ".join(f"r{r}c{c} value" for c in range(num_cols)) + " |"
+
+
+def bench_stream_table(num_rows):
+    import tempfile
+
+    import ooxml_writer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, "table.docx")
+        _, seconds = _timed(
+            ooxml_writer.write_docx, table_markdown_lines(num_rows), out_path
+        )
+        size = os.path.getsize(out_path)
+    return {
+        "units": num_rows,
+        "unit": "rows",
+        "stages": {"write_docx": seconds},
+        "throughput": num_rows / seconds,
+        "output_bytes": size,
+    }
+
+
+MERGE_TEMPLATE = """# Vendor Packet for {{practice}}
+
+Prepared for **{{practice}}** by {{contact}}, [{{email}}](mailto:{{email}}).
+
+| Field | Value |
+|---|---|
+| Practice | {{practice}} |
+| City | {{city}} |
+"""
+
+
+def bench_merge(num_variants):
+    import merge_docs
+
+    template, setup = _timed(merge_docs.MergeTemplate.from_markdown, MERGE_TEMPLATE)
+    start = time.perf_counter()
+    for i in range(num_variants):
+        record = {
+            "practice": f"Practice {i}",
+            "contact": f"Dr. {i}",
+            "email": f"office{i}@example.com",
+            "city": "Las Vegas",
+        }
+        data = template.render(record)
+    seconds = time.perf_counter() - start
+    return {
+        "units": num_variants,
+        "unit": "docs",
+        "stages": {"template": setup, "merge": seconds},
+        "throughput": num_variants / seconds,
+        "output_bytes": len(data),
+    }
+
+
+def bench_images(num_images):
+    """Render the gamma slides as images with a cold, then a warm media cache."""
+    import tempfile
+
+    slides = sorted(glob.glob(os.path.join(SCRIPT_DIR, "../../public/gamma/*.png")))
+    lines = [f"![slide]({slides[i % len(slides)]})" for i in range(num_images)]
+    with tempfile.TemporaryDirectory() as tmp:
+        gd.MEDIA_CACHE_DIR = tmp
+        # Only markdown files embed images; the slides sit under IMAGE_ROOTS
+        source = gd.Path(os.path.join(tmp, "slides.md"))
+        source.write_text("\n".join(lines), encoding="utf-8")
+        size, cold = _timed(lambda: len(gd.render_bytes(source)))
+        gd._PREPARED_IMAGES.clear()
+        _, warm = _timed(gd.render_bytes, source)
+    return {
+        "units": num_images,
+        "unit": "images",
+        "stages": {"cold": cold, "warm": warm},
+        "throughput": num_images / warm,
+        "output_bytes": size,
+    }
+
+
+CASES = [
+    ("document-1k", bench_document, 1_000, False),
+    ("document-100k", bench_document, 100_000, True),
+    ("table-10", bench_table, 10, False),
+    ("table-100", bench_table, 100, False),
+    ("table-1k", bench_table, 1_000, False),
+    ("table-10k", bench_table, 10_000, True),
+    ("bullets-10k", bench_bullets, 10_000, False),
+    ("bullets-50k", bench_bullets, 50_000, True),
+    ("stream-table-10k", bench_stream_table, 10_000, False),
+    ("stream-table-500k", bench_stream_table, 500_000, True),
+    ("merge-500", bench_merge, 500, False),
+    ("images-20", bench_images, 20, False),
+]
+
+
+def run_case(name):
+    """Run one case in this process; called in a fresh worker per case."""
+    for case_name, fn, size, _ in CASES:
+        if case_name == name:
+            gd.new_document()  # template setup is not part of any stage
+            result = fn(size)
+            result["name"] = name
+            result["peak_rss_kb"] = _peak_rss_kb()
+            return result
+    raise KeyError(name)
+
+
+# ---------------------------------------------------------------------------
+# Import time
+# ---------------------------------------------------------------------------
+IMPORT_CASES = [
+    ("import", "import generate_docs"),
+    ("import+docx", "import generate_docs; generate_docs._import_docx()"),
+]
+
+_IMPORT_TIMER = (
+    "import sys, time; sys.path.insert(0, {dir!r}); t = time.perf_counter(); "
+    "{stmt}; print(time.perf_counter() - t)"
+)
+
+
+def bench_import_time(runs=7):
+    """Median wall time of each IMPORT_CASES statement in a fresh interpreter."""
+    results = []
+    for name, stmt in IMPORT_CASES:
+        code = _IMPORT_TIMER.format(dir=SCRIPT_DIR, stmt=stmt)
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-c", code],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            samples.append(float(out.stdout))
+        results.append(
+            {"name": name, "median_s": statistics.median(samples), "runs": runs}
+        )
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Compression presets
+# ---------------------------------------------------------------------------
+def compression_inputs():
+    """(name, source) pairs: the real packets plus one large synthetic one."""
+    inputs = [
+        (os.path.basename(path), Path(path))
+        for path in sorted(glob.glob(os.path.join(gd.OUTPUT_DIR, "*.md")))
+    ]
+    inputs.append(("synthetic-20k", mixed_markdown(20_000)))
+    return inputs
+
+
+def bench_compression(repeat=5):
+    """Best-of-``repeat`` save time and output size for every preset."""
+    results = []
+    for name, source in compression_inputs():
+        doc = gd.build_doc(source)
+        for preset in gd.COMPRESSION_PRESETS:
+            best = None
+            for _ in range(repeat):
+                buf = io.BytesIO()
+                _, seconds = _timed(gd.save_package, doc, buf, preset)
+                best = seconds if best is None else min(best, seconds)
+            results.append(
+                {
+                    "input": name,
+                    "preset": preset,
+                    "save_s": best,
+                    "output_bytes": len(buf.getvalue()),
+                }
+            )
+    return results
+
+
+def print_compression(results):
+    print(f"{'input':<28} {'preset':<8} {'save':>9} {'size':>10}")
+    for r in results:
+        print(
+            f"{r['input']:<28} {r['preset']:<8} {r['save_s'] * 1000:7.1f} ms "
+            f"{r['output_bytes'] / 1024:7.1f} KB"
+        )
+    print("Totals:")
+    for preset in gd.COMPRESSION_PRESETS:
+        rows = [r for r in results if r["preset"] == preset]
+        seconds = sum(r["save_s"] for r in rows)
+        size = sum(r["output_bytes"] for r in rows)
+        print(f"  {preset:<8} {seconds * 1000:8.1f} ms {size / 1024:9.1f} KB")
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SCRIPT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def print_results(results, baseline=None):
+    previous = {r["name"]: r for r in (baseline or {}).get("results", [])}
+    for r in results:
+        stages = ", ".join(f"{k} {v:.3f}s" for k, v in r["stages"].items())
+        line = (
+            f"{r['name']:<15} {r['throughput']:>12,.0f} {r['unit']}/s  "
+            f"{r['output_bytes'] / 1024:>9.1f} KB  "
+            f"rss {r['peak_rss_kb'] or 0:>8,} KB  {stages}"
+        )
+        old = previous.get(r["name"])
+        if old:
+            change = r["throughput"] / old["throughput"] - 1
+            line += f"  ({change:+.0%} vs {baseline.get('commit') or 'baseline'})"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="skip the largest cases")
+    parser.add_argument("--case", action="append", help="run only the named case(s)")
+    parser.add_argument("--json", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results from an earlier run")
+    parser.add_argument(
+        "--import-time",
+        action="store_true",
+        help="measure cold-start import time only",
+    )
+    parser.add_argument(
+        "--compression",
+        action="store_true",
+        help="compare zip compression presets on the real packets",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compression:
+        compression_results = bench_compression()
+        print_compression(compression_results)
+        if args.json:
+            report = {"commit": _git_commit(), "compression": compression_results}
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Saved: {args.json}")
+        return
+
+    if args.import_time:
+        import_results = bench_import_time()
+        for r in import_results:
+            ms = r["median_s"] * 1000
+            print(f"{r['name']:<15} {ms:8.1f} ms (median of {r['runs']})")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"commit": _git_commit(), "import_time": import_results}, f)
+            print(f"Saved: {args.json}")
+        return
+
+    names = [
+        name
+        for name, _, _, large in CASES
+        if (not args.case or name in args.case) and not (args.quick and large)
+    ]
+
+    results = []
+    for name in names:
+        # One process per case, so peak RSS is not inherited from earlier cases
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results.append(pool.submit(run_case, name).result())
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.json:
+        report = {
+            "commit": _git_commit(),
+            "generator_version": gd.GENERATOR_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,668 +1,2480 @@
 """
 Generate Word documents from markdown content for AK Dental partnership docs.
+
+    python generate_docs.py                  # build every packet (= batch)
+    python generate_docs.py list             # packets and whether they're stale
+    python generate_docs.py render EMAIL-DRAFT [-o out.docx | -o -]
+    python generate_docs.py render huge-export.md --stream  # bounded memory
+    python generate_docs.py batch [--workers N] [--force] [--watch] ...
+    python generate_docs.py batch --compression {fast,archive,store}
+    python generate_docs.py batch --reproducible  # byte-identical rebuilds
+    python generate_docs.py tree ../.. /tmp/docs-out  # every .md in a tree
+    python generate_docs.py bundle [PACKET ...] [-o packet.docx]  # one file
+
+Whole-line ``![alt](path)`` images are embedded, resized to the print width
+when Pillow is installed. Paths are relative to the markdown file and must
+stay inside its directory or IMAGE_ROOTS; text sources embed no images.
+Images that cannot be embedded are replaced by their alt text with a
+warning, and remote (URL) images are kept as links.
 """
+import hashlib
+import io
+import json
 import re
-from docx import Document
-from docx.shared import Pt, RGBColor, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+import stat
+import sys
+import time
+import traceback
+from collections import Counter, OrderedDict, namedtuple
+from copy import deepcopy
+from itertools import zip_longest
+from pathlib import Path
 import os
 
+# python-docx and lxml make up most of this module's import time, so they are
+# imported by _import_docx() when rendering starts. Listing documents or
+# checking the manifest never loads them.
+Document = Pt = RGBColor = Inches = Twips = qn = OxmlElement = None
+CT_Tbl = DocxTable = DocxParagraph = DocxRun = RT = etree = DocxImage = None
+
+
+def _import_docx():
+    global Document, Pt, RGBColor, Inches, Twips, qn, OxmlElement
+    global CT_Tbl, DocxTable, DocxParagraph, DocxRun, RT, etree, DocxImage
+    if Document is not None:
+        return
+    from docx.image.image import Image as DocxImage
+    from docx.shared import Pt, RGBColor, Inches, Twips
+    from docx.oxml.ns import qn
+    from docx.oxml import OxmlElement
+    from docx.oxml.table import CT_Tbl
+    from docx.table import Table as DocxTable
+    from docx.text.paragraph import Paragraph as DocxParagraph
+    from docx.text.run import Run as DocxRun
+    from docx.opc.constants import RELATIONSHIP_TYPE as RT
+    from lxml import etree
+    from docx import Document
+
+
 OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Bump whenever a change to parsing, rendering or styling alters the output,
+# so incremental builds regenerate every document.
+GENERATOR_VERSION = "5"
+MANIFEST_NAME = ".docs-manifest.json"
+CONTENT_INDEX_NAME = ".docs-content.json"
+
 
 def set_heading_color(paragraph, r, g, b):
+    _import_docx()
     for run in paragraph.runs:
         run.font.color.rgb = RGBColor(r, g, b)
 
 
-def add_table_from_md(doc, header_row, data_rows):
+HEADER_FILL = "1F4E79"
+# Mark table header rows to repeat at the top of every page a table spans
+REPEAT_TABLE_HEADER = True
+
+# Text that python-docx writes as w:tab / w:br elements, not a single <w:t>
+_RUN_BREAK_RE = re.compile(r"[\t\r\n]")
+
+
+def _style_header_cell(cell):
+    run = cell.paragraphs[0].runs[0]
+    run.bold = True
+    # Shade header
+    tcPr = cell._tc.get_or_add_tcPr()
+    shd = OxmlElement("w:shd")
+    shd.set(qn("w:val"), "clear")
+    shd.set(qn("w:color"), "auto")
+    shd.set(qn("w:fill"), HEADER_FILL)
+    tcPr.append(shd)
+    run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
+
+
+def _fill_text(t, text):
+    """Set the text of a prototype run's <w:t>, matching Run.text."""
+    if not text or _RUN_BREAK_RE.search(text):
+        t.getparent().text = text
+        return
+    t.text = text
+    if len(text.strip()) < len(text):
+        t.set(qn("xml:space"), "preserve")
+
+
+def _fill_cell(ctx, tc, text, header=False):
+    """Fill a prototype cell: plain text in place, inline markup as runs."""
+    runs = cell_runs(text, header)
+    if runs is None:
+        _fill_text(tc[-1][0][-1], text)
+        return
+    p = tc[-1]
+    del p[:]
+    add_runs(DocxParagraph(p, ctx._body), runs)
+
+
+def add_table_from_md(
+    doc, header_row, data_rows, ctx=None, widths=None, repeat_header=None
+):
+    """Add a fixed-layout "Table Grid" table with a shaded header row.
+
+    Only the header row is created through python-docx. One header cell and
+    one data row are then used as prototypes: every other row is a deep copy
+    of the row template with its text filled in, appended straight to the
+    ``w:tbl`` element. This avoids python-docx rebuilding cell proxies for
+    each row access and builds the header shading once.
+
+    Column widths come from ``widths`` (column_widths of the rows when not
+    given), so Word need not measure every cell when opening the document.
+    ``repeat_header`` defaults to REPEAT_TABLE_HEADER. Pass the renderer's
+    DocxContext as ``ctx`` to reuse its resolved styles and insertion point.
+    """
+    if ctx is None:
+        ctx = DocxContext(doc)
+    if widths is None:
+        widths = column_widths(header_row, data_rows)
+    if repeat_header is None:
+        repeat_header = REPEAT_TABLE_HEADER
     num_cols = len(header_row)
-    table = doc.add_table(rows=1 + len(data_rows), cols=num_cols)
-    table.style = "Table Grid"
+    table = ctx.add_table(1, num_cols)
+    table.autofit = False
+    tbl = table._tbl
+    col_widths = [Twips(w) for w in column_twips(widths, ctx._block_width.twips)]
+    for grid_col, width in zip(tbl.tblGrid.gridCol_lst, col_widths):
+        grid_col.w = width
+    hdr_tr = tbl.tr_lst[0]
+    empty_tc = deepcopy(hdr_tr[0])
 
     # Header row
-    hdr_cells = table.rows[0].cells
+    hdr_cell = table.cell(0, 0)
+    hdr_cell.text = "x"
+    _style_header_cell(hdr_cell)
+    hdr_proto = deepcopy(hdr_cell._tc)
     for i, cell_text in enumerate(header_row):
-        hdr_cells[i].text = cell_text.strip()
-        run = hdr_cells[i].paragraphs[0].runs[0]
-        run.bold = True
-        # Shade header
-        tc = hdr_cells[i]._tc
-        tcPr = tc.get_or_add_tcPr()
-        shd = OxmlElement("w:shd")
-        shd.set(qn("w:val"), "clear")
-        shd.set(qn("w:color"), "auto")
-        shd.set(qn("w:fill"), "1F4E79")
-        tcPr.append(shd)
-        run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
+        tc = deepcopy(hdr_proto)
+        tc.width = col_widths[i]
+        _fill_cell(ctx, tc, cell_text.strip(), header=True)
+        hdr_tr[i] = tc
 
     # Data rows
-    for row_idx, row_data in enumerate(data_rows):
-        row_cells = table.rows[row_idx + 1].cells
-        for col_idx, cell_text in enumerate(row_data):
-            row_cells[col_idx].text = cell_text.strip()
-
-    doc.add_paragraph()  # spacing after table
+    if data_rows:
+        data_tc = empty_tc
+        data_tc.clear_content()
+        data_tc.add_p().add_r().text = "x"
+        row_proto = deepcopy(hdr_tr)
+        for i in range(num_cols):
+            row_proto[i] = deepcopy(data_tc)
+            row_proto[i].width = col_widths[i]
+    if repeat_header:
+        hdr_tr.get_or_add_trPr().append(OxmlElement("w:tblHeader"))
+
+    for row_data in data_rows:
+        if len(row_data) > num_cols:
+            raise IndexError(
+                f"table row has {len(row_data)} cells but the header has {num_cols}"
+            )
+        tr = deepcopy(row_proto)
+        for tc, cell_text in zip(tr, row_data):
+            _fill_cell(ctx, tc, cell_text.strip())
+        # Cells missing from short rows stay empty, as python-docx leaves them
+        for tc in tr[len(row_data):]:
+            del tc[-1][:]
+        tbl.append(tr)
+
+    ctx.add_paragraph()  # spacing after table
 
 
 def add_bold_paragraph(doc, line, style="Normal"):
-    """Add a paragraph that supports **bold** inline markup."""
+    """Add a paragraph that supports inline markup (see parse_inline)."""
+    _import_docx()
     para = doc.add_paragraph(style=style)
-    parts = re.split(r"(\*\*[^*]+\*\*)", line)
-    for part in parts:
-        if part.startswith("**") and part.endswith("**"):
-            run = para.add_run(part[2:-2])
-            run.bold = True
-        else:
-            para.add_run(part)
+    add_runs(para, parse_inline(line))
     return para
 
 
-def parse_and_add_line(doc, line, in_table_buffer, table_buffer):
-    """Returns (consumed_table, new_in_table_buffer, new_table_buffer)."""
-    # Heading 1
-    if re.match(r"^# (.+)$", line):
-        if in_table_buffer:
-            flush_table(doc, table_buffer)
-            table_buffer.clear()
-            in_table_buffer = False
-        text = re.match(r"^# (.+)$", line).group(1)
-        para = doc.add_heading(level=1)
-        para.clear()
-        add_inline_bold(para, text)
-        return False, in_table_buffer, table_buffer
+# ---------------------------------------------------------------------------
+# Markdown sources
+# ---------------------------------------------------------------------------
+# A source is markdown text (str), a path to a markdown file (any os.PathLike,
+# e.g. pathlib.Path) or an iterable of lines such as an open file. Files are
+# read lazily, one line at a time.
+def _read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
 
-    # Heading 2
-    if re.match(r"^## (.+)$", line):
-        if in_table_buffer:
-            flush_table(doc, table_buffer)
-            table_buffer.clear()
-            in_table_buffer = False
-        text = re.match(r"^## (.+)$", line).group(1)
-        para = doc.add_heading(level=2)
-        para.clear()
-        add_inline_bold(para, text)
-        return False, in_table_buffer, table_buffer
 
-    # Heading 3
-    if re.match(r"^### (.+)$", line):
-        if in_table_buffer:
-            flush_table(doc, table_buffer)
-            table_buffer.clear()
-            in_table_buffer = False
-        text = re.match(r"^### (.+)$", line).group(1)
-        para = doc.add_heading(level=3)
-        para.clear()
-        add_inline_bold(para, text)
-        return False, in_table_buffer, table_buffer
+def iter_source_lines(source):
+    """Return an iterator over the lines of a markdown source."""
+    if isinstance(source, os.PathLike):
+        return _read_lines(source)
+    if isinstance(source, str):
+        return iter(source.splitlines())
+    return (line.rstrip("\r\n") for line in source)
 
-    # Horizontal rule
-    if re.match(r"^---+$", line.strip()):
-        if in_table_buffer:
-            flush_table(doc, table_buffer)
-            table_buffer.clear()
-            in_table_buffer = False
-        return False, False, table_buffer
-
-    # Table row
-    if line.strip().startswith("|"):
-        cells = [c for c in line.strip().split("|") if c != ""]
-        # Skip separator rows like |---|---|
-        if all(re.match(r"^[\s\-:]+$", c) for c in cells):
-            return False, in_table_buffer, table_buffer
-        table_buffer.append(cells)
-        return False, True, table_buffer
 
-    # If we were in a table and hit a non-table line, flush it
-    if in_table_buffer:
-        flush_table(doc, table_buffer)
-        table_buffer.clear()
-        in_table_buffer = False
-
-    # Checkbox item  - [ ]
-    if re.match(r"^\s*- \[ \] (.+)$", line):
-        text = re.match(r"^\s*- \[ \] (.+)$", line).group(1)
-        para = doc.add_paragraph(style="List Bullet")
-        para.clear()
-        para.add_run("☐  ")
-        add_inline_bold_to_para(para, text)
-        return False, False, table_buffer
-
-    # Italic/note line  *...*
-    if re.match(r"^\*(.+)\*$", line.strip()):
-        text = re.match(r"^\*(.+)\*$", line.strip()).group(1)
-        para = doc.add_paragraph()
-        run = para.add_run(text)
-        run.italic = True
-        run.font.color.rgb = RGBColor(0x59, 0x59, 0x59)
-        return False, False, table_buffer
-
-    # Numbered list
-    if re.match(r"^\d+\. (.+)$", line.strip()):
-        text = re.match(r"^\d+\. (.+)$", line.strip()).group(1)
-        para = doc.add_paragraph(style="List Number")
-        para.clear()
-        add_inline_bold_to_para(para, text)
-        return False, False, table_buffer
-
-    # Bullet list (- item)
-    if re.match(r"^- (.+)$", line.strip()):
-        text = re.match(r"^- (.+)$", line.strip()).group(1)
-        para = doc.add_paragraph(style="List Bullet")
-        para.clear()
-        add_inline_bold_to_para(para, text)
-        return False, False, table_buffer
-
-    # Empty line
-    if line.strip() == "":
-        return False, False, table_buffer
-
-    # Normal paragraph
-    para = doc.add_paragraph()
-    add_inline_bold_to_para(para, line.strip())
-    return False, False, table_buffer
+# ---------------------------------------------------------------------------
+# Line tokenizer
+# ---------------------------------------------------------------------------
+# Each line is classified exactly once. The first non-blank character picks
+# the only patterns that could possibly apply, so a typical line costs one
+# precompiled match (or none) instead of a cascade of re.match calls.
+Token = namedtuple("Token", ["kind", "value", "level"])
+
+HEADING = "heading"
+RULE = "rule"
+TABLE_ROW = "table_row"
+TABLE_SEP = "table_sep"
+CHECKBOX = "checkbox"
+NOTE = "note"
+NUMBERED = "numbered"
+BULLET = "bullet"
+EMPTY = "empty"
+PARAGRAPH = "paragraph"
+IMAGE = "image"
+
+_HEADING_RE = re.compile(r"^(#{1,3}) (.+)$")
+_RULE_RE = re.compile(r"^---+$")
+_CHECKBOX_RE = re.compile(r"^\s*- \[ \] (.+)$")
+_BULLET_RE = re.compile(r"^- (.+)$")
+# A single-* whole line; "**Heading**" lines are ordinary bold paragraphs
+_NOTE_RE = re.compile(r"^\*([^*](?:.*[^*])?)\*$")
+_NUMBERED_RE = re.compile(r"^\d+\. (.+)$")
+_TABLE_SEP_CELL_RE = re.compile(r"^[\s\-:]+$")
+# ![alt](path) or ![alt](<path with spaces> "title") alone on a line
+_IMAGE_RE = re.compile(r'^!\[([^\]]*)\]\((?:<([^>]+)>|(\S+))(?:\s+"[^"]*")?\)$')
+# http:, data:, //host/... -- a scheme needs two letters so C:\ stays a path
+_URL_TARGET_RE = re.compile(r"^(?:[A-Za-z][A-Za-z0-9+.-]+:|//)")
+
+_EMPTY_TOKEN = Token(EMPTY, "", 0)
+_RULE_TOKEN = Token(RULE, "", 0)
+
+
+def classify_line(line):
+    """Classify a single markdown line and return its Token."""
+    stripped = line.strip()
+    if not stripped:
+        return _EMPTY_TOKEN
+    first = stripped[0]
+
+    if first == "#":
+        m = _HEADING_RE.match(line)
+        if m:
+            return Token(HEADING, m.group(2), len(m.group(1)))
+    elif first == "-":
+        if _RULE_RE.match(stripped):
+            return _RULE_TOKEN
+        m = _CHECKBOX_RE.match(line)
+        if m:
+            return Token(CHECKBOX, m.group(1), 0)
+        m = _BULLET_RE.match(stripped)
+        if m:
+            return Token(BULLET, m.group(1), 0)
+    elif first == "|":
+        cells = [c for c in stripped.split("|") if c != ""]
+        # Separator rows like |---|---|
+        if all(_TABLE_SEP_CELL_RE.match(c) for c in cells):
+            return Token(TABLE_SEP, cells, 0)
+        return Token(TABLE_ROW, cells, 0)
+    elif first == "*":
+        m = _NOTE_RE.match(stripped)
+        if m:
+            return Token(NOTE, m.group(1), 0)
+    elif first.isdigit():
+        m = _NUMBERED_RE.match(stripped)
+        if m:
+            return Token(NUMBERED, m.group(1), 0)
+    elif first == "!":
+        m = _IMAGE_RE.match(stripped)
+        if m:
+            alt, target = m.group(1), m.group(2) or m.group(3)
+            if not _URL_TARGET_RE.match(target):
+                return Token(IMAGE, (alt, target), 0)
+            # Remote images are never fetched; they stay a link
+            return Token(PARAGRAPH, f"[{alt or target}]({target})", 0)
+
+    return Token(PARAGRAPH, stripped, 0)
+
+
+def tokenize(lines):
+    """Yield a Token for every line in an iterable of markdown lines."""
+    for line in lines:
+        yield classify_line(line)
 
 
-def add_inline_bold(para, text):
-    """Add runs with **bold** support to an existing paragraph."""
-    parts = re.split(r"(\*\*[^*]+\*\*)", text)
-    for part in parts:
-        if part.startswith("**") and part.endswith("**"):
-            run = para.add_run(part[2:-2])
-            run.bold = True
-        else:
-            if part:
-                para.add_run(part)
+# ---------------------------------------------------------------------------
+# Document tree
+# ---------------------------------------------------------------------------
+# Parsing builds a small tree of block nodes; rendering walks it. Keeping the
+# two stages apart lets a parsed tree be cached, built in another process or
+# handed to a different backend, and lets each stage be timed on its own.
+NOTE_COLOR = (0x59, 0x59, 0x59)
+LINK_COLOR = (0x05, 0x63, 0xC1)
+CODE_FONT = "Consolas"
+CHECKBOX_PREFIX = "☐  "
+
+
+class Run:
+    """A stretch of text with one formatting; ``url`` makes it a hyperlink."""
+
+    __slots__ = ("text", "bold", "italic", "color", "code", "url")
+
+    def __init__(
+        self, text, bold=False, italic=False, color=None, code=False, url=None
+    ):
+        self.text = text
+        self.bold = bold
+        self.italic = italic
+        self.color = color
+        self.code = code
+        self.url = url
+
+    def __repr__(self):
+        extra = "".join(
+            f", {name}={getattr(self, name)!r}"
+            for name in ("color", "code", "url")
+            if getattr(self, name)
+        )
+        return f"Run({self.text!r}, bold={self.bold}, italic={self.italic}{extra})"
 
 
-def add_inline_bold_to_para(para, text):
-    add_inline_bold(para, text)
+class Heading:
+    __slots__ = ("level", "runs")
 
+    def __init__(self, level, runs):
+        self.level = level
+        self.runs = runs
 
-def flush_table(doc, table_buffer):
-    if not table_buffer:
-        return
-    header = table_buffer[0]
-    data = table_buffer[1:] if len(table_buffer) > 1 else []
-    add_table_from_md(doc, header, data)
 
+class Paragraph:
+    __slots__ = ("runs",)
 
-def process_markdown(doc, markdown_text):
-    lines = markdown_text.splitlines()
-    in_table_buffer = False
-    table_buffer = []
+    def __init__(self, runs):
+        self.runs = runs
 
-    for line in lines:
-        _, in_table_buffer, table_buffer = parse_and_add_line(
-            doc, line, in_table_buffer, table_buffer
-        )
 
-    # Flush any remaining table
-    if in_table_buffer and table_buffer:
-        flush_table(doc, table_buffer)
+class ListItem:
+    """A bullet, numbered or checkbox item; ``kind`` is the token kind.
 
+    Checkbox items carry the checkbox glyph as part of their runs.
+    """
 
-# ---------------------------------------------------------------------------
-# Document 1: PARTNERSHIP-OUTLINE.docx
-# ---------------------------------------------------------------------------
-PARTNERSHIP_OUTLINE_MD = r"""# Alex Chireau DDS — Dental Engine Partnership Outline
-**Date:** February 2026
-**Prepared by:** Brad Palubicki, NuStack Digital Ventures
-**Status:** In Discussion
+    __slots__ = ("kind", "runs")
 
----
+    def __init__(self, kind, runs):
+        self.kind = kind
+        self.runs = runs
 
-## The Opportunity
 
-NuStack Digital Ventures is building **Dental Engine** — a SaaS platform purpose-built for dental practices. It automates scheduling, clinical notes, billing, patient communications, and integrates with existing practice management systems (Dentrix, Eaglesoft, Open Dental).
+class Note:
+    """A whole-line ``*italic*`` note; its runs are italic and grey."""
 
-Alex Chireau DDS and AK Ultimate Dental are positioned to be **Partner Clinic #1** — the founding test clinic that shapes the product and shares in its future.
+    __slots__ = ("runs",)
 
----
+    def __init__(self, runs):
+        self.runs = runs
 
-## What Alex Is Being Offered
 
-### Investment
-- **$20,000** investment into Dental Engine (not NuStack Digital Ventures as a whole)
-- Brad investing $20,000 + Ken investing $20,000 = $60,000 total launch capital
-- Proceeds fund: product completion, vendor integrations, sales infrastructure
+class Table:
+    """A pipe table, or one chunk of a table too long to hold in memory.
 
-### Ownership
-- Alex receives **equity ownership in Dental Engine only**
-- Not in NuStack Digital Ventures, not in other NuStack engines
-- Ownership percentage to be determined in operating agreement (proportional to investment)
+    Chunks come from iter_blocks(..., table_chunk_bytes=N): every chunk
+    carries the header, only the first ``opens`` the table and only the last
+    ``closes`` it. Whole tables both open and close. ``widths`` holds the
+    column_widths of the rows (of the first chunk's, for a chunked table).
+    """
 
-### Profitability
-- Alex shares in **Dental Engine profits only**
-- As Dental Engine scales to other practices, Alex's stake generates passive income
-- Revenue model: monthly SaaS subscriptions from dental practices nationwide
+    __slots__ = ("header", "rows", "opens", "closes", "widths")
 
-### What Alex Does NOT Have To Do
-Alex does NOT need to:
-- Build anything
-- Manage staff or operations
-- Handle sales or marketing
-- Work more than a few hours per quarter
+    def __init__(self, header, rows, opens=True, closes=True, widths=None):
+        self.header = header
+        self.rows = rows
+        self.opens = opens
+        self.closes = closes
+        self.widths = widths
 
----
 
-## Alex's Role
+class Image:
+    """A whole-line ``![alt](path)`` image; ``path`` is as written."""
 
-### Spokesperson (Minimal Time)
-- Appear in 2-3 short video testimonials (filmed at his office)
-- Allow use of name/credentials in marketing materials: "Built with and trusted by AK Ultimate Dental, Las Vegas"
-- Available for occasional reference calls with prospective dental clients
-- Estimated time: **2-4 hours total per quarter**
+    __slots__ = ("alt", "path")
 
-### Test Clinic (Active Partnership)
-- AK Ultimate Dental runs the live Dental Engine platform
-- Alex/staff provides feedback on what works and what doesn't
-- Early access to all new features before general release
-- Brad/NuStack handles all implementation, support, and maintenance
-- Staff training provided at no cost
+    def __init__(self, alt, path):
+        self.alt = alt
+        self.path = path
+
+
+class SectionBreak:
+    """Ends the current section; what follows starts on a new page.
+
+    Not produced by the parser: bundles put one between their documents.
+    """
+
+    __slots__ = ()
+
+
+class ParsedDoc:
+    __slots__ = ("blocks",)
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def __len__(self):
+        return len(self.blocks)
+
+
+def coalesce_runs(runs):
+    """Merge adjacent runs that share the same formatting (in place)."""
+    out = []
+    pieces = []  # texts making up out[-1], joined once it is complete
+    for run in runs:
+        if out:
+            last = out[-1]
+            if (
+                last.bold == run.bold
+                and last.italic == run.italic
+                and last.color == run.color
+                and last.code == run.code
+                and last.url == run.url
+            ):
+                pieces.append(run.text)
+                continue
+            if len(pieces) > 1:
+                last.text = "".join(pieces)
+        out.append(run)
+        pieces = [run.text]
+    if len(pieces) > 1:
+        out[-1].text = "".join(pieces)
+    return out
+
+
+# Characters that can start inline markup. Text between them is copied in
+# one slice, so a line costs one pass however much markup it has.
+_INLINE_SPECIAL_RE = re.compile(r"[*`\[\\]")
+_ASCII_PUNCT = frozenset("!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~")
+
+
+def _scan_inline(text, url=None):
+    """Split text into inline items, pairing ``*`` delimiter runs as it goes.
+
+    Items are ("t", text), ("c", code text), ("l", link runs) and delimiter
+    lists ["d", literal count, opens bold, opens italic, closes bold, closes
+    italic]. A delimiter run can close only if it follows non-space and open
+    only if non-space follows; a closer pairs with the nearest open run
+    (** with ** for bold, otherwise one * for italic), and unpaired
+    asterisks stay literal. Code spans and links are found with str.find
+    from positions that only move forward.
+    """
+    items = []
+    openers = []
+    n = len(text)
+    pos = 0
+    search = _INLINE_SPECIAL_RE.search
+    unclosed_ticks = set()  # backtick run lengths with no closer further on
+    link_mid = -2  # position of the next "](", -1 when there is none
+    link_start = -1  # the "[" that opens the link ending at link_mid
+    paren = -2  # position of the next ")" after link_mid, -1 when there is none
+    while True:
+        m = search(text, pos)
+        if m is None:
+            break
+        i = m.start()
+        if i > pos:
+            items.append(("t", text[pos:i]))
+        ch = text[i]
+
+        if ch == "*":
+            j = i + 1
+            while j < n and text[j] == "*":
+                j += 1
+            count = j - i
+            item = ["d", 0, 0, 0, 0, 0]
+            if i > 0 and not text[i - 1].isspace():
+                while count and openers:
+                    opener = openers[-1]
+                    use = 2 if count >= 2 and opener[1] >= 2 else 1
+                    opener[1] -= use
+                    count -= use
+                    if use == 2:
+                        opener[2] += 1
+                        item[4] += 1
+                    else:
+                        opener[3] += 1
+                        item[5] += 1
+                    if not opener[1]:
+                        openers.pop()
+            item[1] = count
+            items.append(item)
+            if count and j < n and not text[j].isspace():
+                openers.append(item)
+            pos = j
+
+        elif ch == "`":
+            j = i + 1
+            while j < n and text[j] == "`":
+                j += 1
+            ticks = text[i:j]
+            end = -1
+            if len(ticks) not in unclosed_ticks:
+                end = text.find(ticks, j)
+                # The closer must be a run of exactly as many backticks
+                while end != -1 and text.startswith("`", end + len(ticks)):
+                    k = end + len(ticks)
+                    while k < n and text[k] == "`":
+                        k += 1
+                    end = text.find(ticks, k)
+                if end == -1:
+                    unclosed_ticks.add(len(ticks))
+            if end == -1:
+                items.append(("t", ticks))
+                pos = j
+                continue
+            code = text[j:end]
+            if len(code) > 2 and code[0] == " " and code[-1] == " " and code.strip():
+                code = code[1:-1]
+            items.append(("c", code))
+            pos = end + len(ticks)
+
+        elif ch == "[":
+            if url is None and link_mid != -1 and link_mid < i:
+                link_mid = text.find("](", i)
+                # Link text cannot contain brackets, so only the last "["
+                # before "](" can open the link
+                link_start = text.rfind("[", i, link_mid) if link_mid != -1 else -1
+                if link_start != -1 and text.find("]", link_start, link_mid) != -1:
+                    link_start = -1
+            close = -1
+            if i == link_start:
+                if paren != -1 and paren < link_mid + 2:
+                    paren = text.find(")", link_mid + 2)
+                close = paren
+                target = text[link_mid + 2 : close] if close != -1 else ""
+                if not target or any(c.isspace() for c in target):
+                    close = -1
+            if close == -1:
+                items.append(("t", "["))
+                pos = i + 1
+                continue
+            label = _scan_inline(text[i + 1 : link_mid], target)
+            items.append(("l", _resolve_inline(label, target)))
+            pos = close + 1
+
+        else:  # backslash escape
+            nxt = text[i + 1 : i + 2]
+            if nxt and nxt in _ASCII_PUNCT:
+                items.append(("t", nxt))
+                pos = i + 2
+            else:
+                items.append(("t", "\\"))
+                pos = i + 1
+
+    if pos < n:
+        items.append(("t", text[pos:]))
+    return items
+
+
+def _resolve_inline(items, url=None):
+    """Turn _scan_inline items into Runs, applying emphasis in order."""
+    runs = []
+    bold = italic = 0
+    for item in items:
+        kind = item[0]
+        if kind == "t":
+            runs.append(Run(item[1], bold > 0, italic > 0, url=url))
+        elif kind == "c":
+            runs.append(Run(item[1], bold > 0, italic > 0, code=True, url=url))
+        elif kind == "l":
+            for run in item[1]:
+                run.bold = run.bold or bold > 0
+                run.italic = run.italic or italic > 0
+                runs.append(run)
+        else:
+            # Closing takes effect before the literal leftover, opening after
+            bold -= item[4]
+            italic -= item[5]
+            if item[1]:
+                runs.append(Run("*" * item[1], bold > 0, italic > 0, url=url))
+            bold += item[2]
+            italic += item[3]
+    return runs
+
+
+def parse_inline(text, prefix=None):
+    """Split text into Runs.
+
+    Handles **bold**, *italic*, ***bold italic***, `code`, [text](url) links
+    and backslash escapes in a single left-to-right scan. ``prefix`` is
+    plain text placed before the content (the checkbox glyph). Adjacent runs
+    with identical formatting are merged, so the output never holds more
+    runs than there are formatting changes.
+    """
+    runs = [Run(prefix)] if prefix else []
+    if _INLINE_SPECIAL_RE.search(text) is None:
+        if text:
+            runs.append(Run(text))
+        return coalesce_runs(runs)
+    runs += _resolve_inline(_scan_inline(text))
+    return coalesce_runs(runs)
+
+
+def note_runs(text):
+    """Runs for a note line: its inline markup, all italic and grey."""
+    runs = parse_inline(text)
+    for run in runs:
+        run.italic = True
+        run.color = NOTE_COLOR
+    return coalesce_runs(runs)
+
+
+def cell_runs(text, header=False):
+    """Runs for a table cell with inline markup, or None for plain text.
+
+    Header runs are bold and white, like the plain header cells.
+    """
+    if _INLINE_SPECIAL_RE.search(text) is None:
+        return None
+    runs = parse_inline(text)
+    if len(runs) == 1:
+        run = runs[0]
+        if not (run.bold or run.italic or run.code or run.url) and run.text == text:
+            return None
+    if header:
+        for run in runs:
+            run.bold = True
+            run.color = (0xFF, 0xFF, 0xFF)
+        runs = coalesce_runs(runs)
+    return runs
+
+
+def block_from_token(token):
+    """Build the block node for a non-table token (None for blank lines/rules)."""
+    kind = token.kind
+    if kind == PARAGRAPH:
+        return Paragraph(parse_inline(token.value))
+    if kind == BULLET or kind == NUMBERED:
+        return ListItem(kind, parse_inline(token.value))
+    if kind == CHECKBOX:
+        return ListItem(kind, parse_inline(token.value, prefix=CHECKBOX_PREFIX))
+    if kind == HEADING:
+        return Heading(token.level, parse_inline(token.value))
+    if kind == NOTE:
+        return Note(note_runs(token.value))
+    if kind == IMAGE:
+        return Image(*token.value)
+    return None
+
+
+def make_table(rows):
+    """Build a Table node from buffered rows of raw cell text."""
+    header = [c.strip() for c in rows[0]]
+    data = [[c.strip() for c in row] for row in rows[1:]]
+    return Table(header, data, widths=column_widths(header, data))
+
+
+# Word and LibreOffice measure every cell of an auto-fit table when opening
+# it, which takes seconds for big tables. Column widths are estimated from
+# raw text lengths instead, and tables are written with a fixed layout.
+MAX_COLUMN_CHARS = 60
+# Cells up to this long never wrap; longer ones may, down to this width
+NOWRAP_COLUMN_CHARS = 10
+# Rough width of a character of 11pt body text, and a cell's side margins
+CHAR_TWIPS = 110
+CELL_PADDING_TWIPS = 230
+
+
+def column_widths(header, rows):
+    """Estimated (minimum, preferred) width in characters of each column.
+
+    The preferred width is the longest cell, capped at MAX_COLUMN_CHARS so
+    one long column cannot squeeze the others. The minimum keeps headings
+    from breaking mid-word and short values on one line.
+    """
+    num_cols = len(header)
+    longest = [max(map(len, col)) for col in zip_longest(*rows, fillvalue="")]
+    longest += [0] * (num_cols - len(longest))
+    widths = []
+    for text, length in zip(header, longest):
+        word = max(map(len, text.split()), default=0)
+        minimum = max(word, min(length, NOWRAP_COLUMN_CHARS))
+        widths.append((minimum, max(minimum, min(length, MAX_COLUMN_CHARS))))
+    return widths
+
+
+def column_twips(widths, total):
+    """Split ``total`` twips between columns of (minimum, preferred) widths.
+
+    Columns that all fit get room in proportion to their preferred widths.
+    Otherwise each gets its minimum and the rest goes to the columns that
+    want more, in proportion to how much more. Sums to ``total`` exactly.
+    """
+    mins = [m * CHAR_TWIPS + CELL_PADDING_TWIPS for m, _ in widths]
+    wants = [p * CHAR_TWIPS + CELL_PADDING_TWIPS for _, p in widths]
+    spare = total - sum(mins)
+    if sum(wants) <= total or spare <= 0:
+        weights = wants if spare > 0 else mins
+        out = [total * w // sum(weights) for w in weights]
+    else:
+        extra = [w - m for w, m in zip(wants, mins)]
+        out = [m + spare * e // sum(extra) for m, e in zip(mins, extra)]
+    out[-1] += total - sum(out)
+    return out
+
+
+def _row_bytes(cells):
+    """Rough in-memory size of one buffered table row (list + str objects)."""
+    return 64 + 8 * len(cells) + sum(len(c) for c in cells) + 56 * len(cells)
+
+
+def _table_chunk(rows, header, widths, closes):
+    """Table node for buffered rows; ``header`` is None for a first chunk."""
+    if header is None:
+        table = make_table(rows)
+        table.closes = closes
+        return table
+    data = [[c.strip() for c in row] for row in rows]
+    return Table(header, data, False, closes, widths)
+
+
+def iter_blocks(lines, stats=None, table_chunk_bytes=None):
+    """Yield block nodes for an iterable of markdown lines.
+
+    With ``table_chunk_bytes``, a table is yielded in chunks whenever its
+    buffered rows reach about that many bytes, so memory stays bounded no
+    matter how many rows it has. Only the streaming writer accepts chunks.
+    """
+    table_buffer = []
+    buffered = 0
+    header = widths = None  # the open table's, once a chunk has been yielded
+    tokens = tokenize(lines)
+    if stats is not None:
+        tokens = _count_tokens(tokens, stats.counters)
+
+    for token in tokens:
+        kind = token.kind
+        if kind == TABLE_SEP:
+            continue
+        if kind == TABLE_ROW:
+            table_buffer.append(token.value)
+            if table_chunk_bytes is not None:
+                buffered += _row_bytes(token.value)
+                if buffered >= table_chunk_bytes:
+                    chunk = _table_chunk(table_buffer, header, widths, closes=False)
+                    header, widths = chunk.header, chunk.widths
+                    yield chunk
+                    table_buffer = []
+                    buffered = 0
+            continue
+        # Any other line ends the current table
+        if table_buffer or header is not None:
+            yield _table_chunk(table_buffer, header, widths, closes=True)
+            table_buffer = []
+            buffered = 0
+            header = widths = None
+        block = block_from_token(token)
+        if block is not None:
+            yield block
+
+    if table_buffer or header is not None:
+        yield _table_chunk(table_buffer, header, widths, closes=True)
+
+
+def parse_markdown(source, stats=None):
+    """Parse a markdown source into a ParsedDoc."""
+    if stats is None:
+        return ParsedDoc(list(iter_blocks(iter_source_lines(source))))
+    start = time.perf_counter()
+    tree = ParsedDoc(list(iter_blocks(iter_source_lines(source), stats)))
+    stats.add_span("parse", time.perf_counter() - start)
+    return tree
 
----
 
-## What NuStack Delivers to Alex
+# ---------------------------------------------------------------------------
+# Instrumentation
+# ---------------------------------------------------------------------------
+# Opt-in: pass a DocStats to parse/render/write calls (or register a hook) to
+# collect per-document counters and stage timings. Without one, the normal
+# uninstrumented code paths run.
+class DocStats:
+    """Counters and wall-time spans for one rendered document.
 
-1. **AK Ultimate Dental website** — fully built, hosted, live at custom domain
-2. **Dental Engine platform** — full access for AK Ultimate Dental, no monthly fee
-3. **Integrations**: Dentrix, credit card processing, electronic billing, payroll
-4. **Patient communications**: automated appointment reminders, recall campaigns
-5. **Analytics dashboard**: production reports, patient retention metrics
-6. **Ongoing development**: new features added continuously
+    Counters: ``lines``, ``lines.<token kind>``, ``blocks``, ``tables``,
+    ``table_rows``, ``runs``, ``bytes_written`` and, with a section cache,
+    ``sections`` and ``sections.cached``. Spans (seconds): ``parse``,
+    ``render``, ``table`` (the table-building share of render) and ``save``.
+    """
 
----
+    __slots__ = ("name", "counters", "spans")
 
-## Capital Allocation ($60K Total)
+    def __init__(self, name=None):
+        self.name = name
+        self.counters = Counter()
+        self.spans = {}
 
-| Use | Amount |
-|-----|--------|
-| Product completion + QA | $20,000 |
-| Vendor integrations (Dentrix API, etc.) | $10,000 |
-| Marketing + first 10 client acquisition | $15,000 |
-| Legal (operating agreements, IP assignment) | $5,000 |
-| Operating reserve | $10,000 |
+    def add_span(self, stage, seconds):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
 
----
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "counters": dict(self.counters),
+            "spans": dict(self.spans),
+        }
 
-## Timeline to Next Milestone
+    def summary(self):
+        spans = ", ".join(f"{k} {v:.3f}s" for k, v in self.spans.items())
+        counts = ", ".join(f"{k}={v}" for k, v in sorted(self.counters.items()))
+        return f"{self.name or '<document>'}: {spans} | {counts}"
 
-| Milestone | Target |
-|-----------|--------|
-| Partnership agreement signed | March 2026 |
-| Vendor info gathered from Alex | March 2026 |
-| Dentrix API integration complete | April 2026 |
-| AK Dental live on full platform | April 2026 |
-| First external dental client onboarded | May 2026 |
-| Revenue sharing begins | Upon first client |
 
----
+STATS_HOOKS = []
 
-## Information Needed From Alex
 
-See VENDOR-INFO-REQUEST for the full list.
+def add_stats_hook(hook):
+    """Register hook(stats) to be called with the DocStats of every document
+    rendered by create_doc/create_docs. Registering a hook turns collection on.
+    """
+    STATS_HOOKS.append(hook)
 
-**Key items:**
-- Dentrix account/subscription details (for API integration)
-- Current credit card processor (name, contact)
-- Payroll provider
-- Electronic billing / clearinghouse currently used
-- NPI number(s) for the practice
-- Tax ID / EIN for the practice entity
 
----
+def remove_stats_hook(hook):
+    STATS_HOOKS.remove(hook)
 
-## Next Steps to Move Forward
 
-1. Alex confirms interest in $20K investment tier
-2. Brad sends operating agreement draft (attorney review)
-3. Alex provides vendor information sheet
-4. NuStack begins API integrations
-5. AK Dental migrates to new domain + Dental Engine platform
-6. Partnership formally launched
+def _emit_stats(stats):
+    for hook in STATS_HOOKS:
+        hook(stats)
 
----
 
-*This document is a working outline only. All terms subject to formal operating agreement.*
-"""
+def _count_tokens(tokens, counters):
+    for token in tokens:
+        counters["lines"] += 1
+        counters["lines." + token.kind] += 1
+        yield token
+
 
 # ---------------------------------------------------------------------------
-# Document 2: VENDOR-INFO-REQUEST.docx
+# python-docx renderer
 # ---------------------------------------------------------------------------
-VENDOR_INFO_MD = r"""# Vendor Information Request — AK Ultimate Dental
-**For:** Alex Chireau DDS
-**Purpose:** API integration planning for Dental Engine platform
-**Date:** February 2026
-
----
-
-## Why We Need This
+# Formatting -> an empty w:r (rPr plus one w:t) to deep-copy for each run.
+# Building rPr children through python-docx parses a namespaced XML snippet
+# per element, several times slower than copying a finished run.
+_RUN_PROTOTYPES = {}
+
+
+def _run_prototype(bold, italic, color, code, link):
+    key = (bold, italic, color, code, link)
+    proto = _RUN_PROTOTYPES.get(key)
+    if proto is None:
+        run = DocxRun(OxmlElement("w:r"), None)
+        run.text = "x"
+        if code:
+            run.font.name = CODE_FONT
+        if bold:
+            run.bold = True
+        if italic:
+            run.italic = True
+        if link:
+            run.font.color.rgb = RGBColor(*LINK_COLOR)
+            run.font.underline = True
+        elif color is not None:
+            run.font.color.rgb = RGBColor(*color)
+        proto = _RUN_PROTOTYPES[key] = run._r
+    return proto
+
+
+def add_runs(para, runs):
+    """Append runs to a python-docx paragraph.
+
+    Consecutive runs with the same url share one w:hyperlink, whose external
+    relationship python-docx adds to the part once per url.
+    """
+    p = para._p
+    link = link_url = None
+    for r in runs:
+        if r.url is None:
+            link_url = None
+            parent = p
+        else:
+            if r.url != link_url:
+                link = OxmlElement("w:hyperlink")
+                link.set(qn("r:id"), para.part.relate_to(r.url, RT.HYPERLINK, True))
+                p.append(link)
+                link_url = r.url
+            parent = link
+        color = tuple(r.color) if r.color is not None else None
+        r_el = deepcopy(
+            _run_prototype(r.bold, r.italic, color, r.code, r.url is not None)
+        )
+        _fill_text(r_el[-1], r.text)
+        parent.append(r_el)
+
+
+# Styles the renderer applies, resolved to style ids once per document
+# instead of by name (a linear scan of the styles part) per paragraph.
+RENDER_STYLES = (
+    "Heading 1",
+    "Heading 2",
+    "Heading 3",
+    "List Bullet",
+    "List Number",
+    "Table Grid",
+)
+
+
+def resolve_styles(doc):
+    """Map each name in RENDER_STYLES to its style id in doc."""
+    styles = doc.styles
+    return {name: styles[name].style_id for name in RENDER_STYLES}
+
+
+class DocxContext:
+    """Per-document state shared by the python-docx renderers.
+
+    Holds the resolved style ids and the body's trailing w:sectPr, so new
+    paragraphs and tables are inserted directly before it. doc.add_paragraph()
+    and doc.add_table() search the whole body for that anchor on every call,
+    which makes long documents quadratic. Relative image paths are resolved
+    against ``base_dir``, the markdown file's directory (None embeds no
+    images); prepared images are cached in ``media_dir`` when it is set.
+    """
+
+    __slots__ = (
+        "doc",
+        "styles",
+        "stats",
+        "base_dir",
+        "media_dir",
+        "_body",
+        "_body_el",
+        "_sect_pr",
+        "_block_width",
+    )
+
+    def __init__(self, doc, stats=None, base_dir=None, media_dir=None):
+        _import_docx()
+        self.doc = doc
+        self.styles = resolve_styles(doc)
+        self.stats = stats
+        self.base_dir = base_dir
+        self.media_dir = media_dir
+        self._body = doc._body
+        self._body_el = doc.element.body
+        self._sect_pr = self._body_el.sectPr
+        self._block_width = doc._block_width
+
+    def insert(self, element):
+        """Append a block-level element to the body content."""
+        if self._sect_pr is None:
+            self._body_el.append(element)
+        else:
+            self._sect_pr.addprevious(element)
+
+    def mark(self):
+        """Return a marker for the current end of the body content."""
+        if self._sect_pr is not None:
+            return self._sect_pr.getprevious()
+        return self._body_el[-1] if len(self._body_el) else None
+
+    def inserted_since(self, mark):
+        """Return the body elements inserted after mark()."""
+        if mark is not None:
+            el = mark.getnext()
+        else:
+            el = self._body_el[0] if len(self._body_el) else None
+        out = []
+        while el is not None and el is not self._sect_pr:
+            out.append(el)
+            el = el.getnext()
+        return out
+
+    def add_paragraph(self, style_id=None):
+        p = OxmlElement("w:p")
+        self.insert(p)
+        para = DocxParagraph(p, self._body)
+        if style_id is not None:
+            para._p.style = style_id
+        return para
+
+    def add_table(self, rows, cols):
+        """Add an empty "Table Grid" table, as doc.add_table() would."""
+        tbl = CT_Tbl.new_tbl(rows, cols, self._block_width)
+        tbl.tblStyle_val = self.styles["Table Grid"]
+        self.insert(tbl)
+        return DocxTable(tbl, self._body)
+
+
+def _render_heading(ctx, block):
+    para = ctx.add_paragraph(ctx.styles[f"Heading {block.level}"])
+    add_runs(para, block.runs)
+
+
+def _render_paragraph(ctx, block):
+    para = ctx.add_paragraph()
+    add_runs(para, block.runs)
+
+
+def _render_list_item(ctx, block):
+    name = "List Number" if block.kind == NUMBERED else "List Bullet"
+    para = ctx.add_paragraph(ctx.styles[name])
+    add_runs(para, block.runs)
+
+
+def _render_note(ctx, block):
+    para = ctx.add_paragraph()
+    add_runs(para, block.runs)
+
+
+def _render_section_break(ctx, block):
+    # A section ends with a paragraph carrying its w:sectPr; the body's own
+    # trailing w:sectPr then describes the section that follows.
+    p = OxmlElement("w:p")
+    if ctx._sect_pr is not None:
+        p.set_sectPr(deepcopy(ctx._sect_pr))
+    else:
+        p.set_sectPr(OxmlElement("w:sectPr"))
+    ctx.insert(p)
+
+
+def image_fallback_runs(block, reason):
+    """Warn that an image is not embedded; return the runs shown instead."""
+    print(f"Image not embedded: {reason}", file=sys.stderr)
+    return [Run(f"[{block.alt or block.path}]", italic=True, color=NOTE_COLOR)]
+
+
+def _render_image(ctx, block):
+    try:
+        path = resolve_image(block.path, ctx.base_dir)
+    except ImageError as exc:
+        # A missing or refused image costs a warning, not the document
+        add_runs(ctx.add_paragraph(), image_fallback_runs(block, exc))
+        if ctx.stats is not None:
+            ctx.stats.counters["runs"] += 1
+        return
+    max_px = round(ctx._block_width.inches * IMAGE_DPI)
+    data = prepare_image(path, max_px, ctx.media_dir)
+    # Shown at IMAGE_DPI, so images already at the print width fill it and
+    # smaller ones (logos) are not blown up
+    px_width = DocxImage.from_blob(data).px_width
+    width = min(ctx._block_width, Inches(px_width / IMAGE_DPI))
+    shape = ctx.add_paragraph().add_run().add_picture(io.BytesIO(data), width)
+    shape._inline.docPr.set("descr", block.alt)
+    if ctx.stats is not None:
+        ctx.stats.counters["images"] += 1
+
+
+def _render_table(ctx, block):
+    if not (block.opens and block.closes):
+        raise ValueError("table chunks can only be written by ooxml_writer")
+    if ctx.stats is None:
+        add_table_from_md(ctx.doc, block.header, block.rows, ctx, block.widths)
+        return
+    start = time.perf_counter()
+    add_table_from_md(ctx.doc, block.header, block.rows, ctx, block.widths)
+    ctx.stats.add_span("table", time.perf_counter() - start)
+
+
+_DOCX_RENDERERS = {
+    Heading: _render_heading,
+    Paragraph: _render_paragraph,
+    ListItem: _render_list_item,
+    Note: _render_note,
+    Table: _render_table,
+    Image: _render_image,
+    SectionBreak: _render_section_break,
+}
+
+
+def render_block(doc, block, ctx=None):
+    if ctx is None:
+        ctx = DocxContext(doc)
+    _DOCX_RENDERERS[type(block)](ctx, block)
+
+
+def _table_run_count(block):
+    """Runs a table renders: one per plain cell, its markup's runs otherwise."""
+    count = 0
+    for header, rows in ((True, (block.header,)), (False, block.rows)):
+        for row in rows:
+            for text in row:
+                runs = cell_runs(text, header)
+                count += 1 if runs is None else len(runs)
+    return count
+
+
+def _render_into(ctx, blocks):
+    stats = ctx.stats
+    if stats is None:
+        for block in blocks:
+            _DOCX_RENDERERS[type(block)](ctx, block)
+        return
 
-To fully integrate Dental Engine with your existing practice systems, we need account details and contact information for each vendor. We will handle all API setup, integration, and ongoing maintenance — we just need the baseline info to get started.
+    counters = stats.counters
+    start = time.perf_counter()
+    for block in blocks:
+        counters["blocks"] += 1
+        if type(block) is Table:
+            counters["tables"] += 1
+            counters["table_rows"] += len(block.rows)
+            counters["runs"] += _table_run_count(block)
+        elif type(block) is Image:
+            pass  # counted by _render_image
+        else:
+            counters["runs"] += len(block.runs)
+        _DOCX_RENDERERS[type(block)](ctx, block)
+    stats.add_span("render", time.perf_counter() - start)
 
-Nothing will be changed or disrupted at your practice without your approval.
 
----
+def render_blocks(doc, blocks, stats=None, base_dir=None, media_dir=None):
+    """Render block nodes (a ParsedDoc or any iterable of blocks) into doc."""
+    _render_into(DocxContext(doc, stats, base_dir, media_dir), blocks)
 
-## Practice Management System (PMS)
 
-### Dentrix (Henry Schein)
-- [ ] Dentrix version currently installed (e.g., Dentrix G7, G8)
-- [ ] Henry Schein account number
-- [ ] Contact name at your Dentrix account rep
-- [ ] Is Dentrix Ascend (cloud) or server-based?
-- [ ] Do you currently use the Dentrix patient portal?
-- [ ] Are you on a support/maintenance plan? (needed for API access)
+# ---------------------------------------------------------------------------
+# Media cache
+# ---------------------------------------------------------------------------
+# Images are downscaled to the print width and recompressed once, then kept
+# in a .media-cache directory beside the output under the source file's hash
+# and the target width, so rebuilds and other documents reuse them.
+# python-docx stores identical image bytes once per package. Resizing needs
+# Pillow, which is optional: without it images are embedded as they are.
+IMAGE_DPI = 200
+JPEG_QUALITY = 85
+MEDIA_CACHE_NAME = ".media-cache"
+# Set to share one media cache between all output directories
+MEDIA_CACHE_DIR = None
+# Images may come from the markdown file's own directory tree or from these
+# (the site's public assets); anything else is refused.
+IMAGE_ROOTS = [os.path.realpath(os.path.join(OUTPUT_DIR, "..", "..", "public"))]
+MAX_IMAGE_BYTES = 25 * 1024 * 1024
+
+
+class ImageError(ValueError):
+    """An image reference that cannot be embedded."""
+
+
+def _is_within(path, root):
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def resolve_image(path, base_dir):
+    """Return the real path of the image file ``path`` refers to.
+
+    ``base_dir`` is the markdown file's directory; text sources (None) may
+    not embed images at all, so rendering untrusted text cannot read files.
+    Raises ImageError for paths outside base_dir and IMAGE_ROOTS, and for
+    anything but a regular file of at most MAX_IMAGE_BYTES.
+    """
+    if base_dir is None:
+        raise ImageError(f"{path}: images are only embedded from markdown files")
+    full = os.path.realpath(os.path.join(base_dir, path))
+    roots = [os.path.realpath(base_dir), *IMAGE_ROOTS]
+    if not any(_is_within(full, root) for root in roots):
+        raise ImageError(f"{path}: outside the document's directory and IMAGE_ROOTS")
+    try:
+        st = os.stat(full)
+    except OSError:
+        raise ImageError(f"{path}: no such file") from None
+    if not stat.S_ISREG(st.st_mode):
+        raise ImageError(f"{path}: not a regular file")
+    if st.st_size > MAX_IMAGE_BYTES:
+        raise ImageError(f"{path}: larger than {MAX_IMAGE_BYTES} bytes")
+    return full
+
+_FILE_DIGESTS = {}  # (path, mtime_ns, size) -> sha256
+_PREPARED_IMAGES = {}  # cache key -> bytes, for this process
+_warned_no_pillow = False
+
+
+def image_refs(text):
+    """Yield the path of every whole-line image in markdown text."""
+    for line in text.splitlines():
+        if line.lstrip().startswith("!["):
+            token = classify_line(line)
+            if token.kind == IMAGE:
+                yield token.value[1]
+
+
+def embedded_images(source):
+    """Real paths of the files a markdown file's images point at.
+
+    Paths are not checked, only stat()ed by watch mode; missing files are
+    included so that creating one is noticed. [] if source is unreadable.
+    """
+    base_dir = os.path.dirname(os.path.abspath(source))
+    try:
+        with open(source, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    except OSError:
+        return []
+    return [os.path.realpath(os.path.join(base_dir, p)) for p in image_refs(text)]
+
+
+def file_digest(path):
+    """sha256 of a file, remembered per process until the file changes."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    digest = _FILE_DIGESTS.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        digest = _FILE_DIGESTS[key] = h.hexdigest()
+    return digest
+
+
+def media_cache_dir(out):
+    """Media cache for output written to out; None (memory only) for streams."""
+    if MEDIA_CACHE_DIR is not None:
+        return MEDIA_CACHE_DIR
+    if isinstance(out, (str, os.PathLike)):
+        return os.path.join(os.path.dirname(os.path.abspath(out)), MEDIA_CACHE_NAME)
+    return None
+
+
+def prepare_image(path, max_px, cache_dir=None):
+    """Bytes to embed for an image file, at most ``max_px`` pixels wide.
+
+    Prepared images are kept in ``cache_dir`` when one is given.
+    """
+    key = f"{file_digest(path)[:32]}-{max_px}"
+    data = _PREPARED_IMAGES.get(key)
+    if data is not None:
+        return data
+    for ext in (".png", ".jpg") if cache_dir else ():
+        try:
+            with open(os.path.join(cache_dir, key + ext), "rb") as f:
+                data = f.read()
+            break
+        except OSError:
+            pass
+    else:
+        try:
+            data, ext = _resize_image(path, max_px)
+        except ImportError:
+            global _warned_no_pillow
+            if not _warned_no_pillow:
+                _warned_no_pillow = True
+                print(
+                    "Pillow is not installed; images are embedded unresized",
+                    file=sys.stderr,
+                )
+            with open(path, "rb") as f:
+                return f.read()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_path = os.path.join(cache_dir, key + ext)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, cache_path)
+    _PREPARED_IMAGES[key] = data
+    return data
+
+
+def _resize_image(path, max_px):
+    """Return (bytes, extension) of the image scaled to at most max_px wide.
+
+    Images with transparency stay PNG; others become JPEG. An image already
+    small enough keeps its original bytes unless re-encoding saves space.
+    """
+    from PIL import Image as PILImage
+
+    with PILImage.open(path) as im:
+        original_format = im.format
+        im.load()
+        resized = im.width > max_px
+        if resized:
+            height = max(1, round(im.height * max_px / im.width))
+            im = im.resize((max_px, height), PILImage.LANCZOS)
+        buf = io.BytesIO()
+        if im.mode in ("RGBA", "LA") or "transparency" in im.info:
+            im.save(buf, "PNG", optimize=True)
+            ext = ".png"
+        else:
+            im.convert("RGB").save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            ext = ".jpg"
+    data = buf.getvalue()
+    if not resized and original_format in ("PNG", "JPEG"):
+        original_size = os.path.getsize(path)
+        if original_size <= len(data):
+            with open(path, "rb") as f:
+                data = f.read()
+            ext = ".png" if original_format == "PNG" else ".jpg"
+    return data, ext
 
-*Note: Dentrix API integration requires an active support plan and Henry Schein partner approval. We will initiate the partner application process.*
 
----
+# ---------------------------------------------------------------------------
+# Section render cache
+# ---------------------------------------------------------------------------
+# Packets repeat whole sections (allocation tables, contact footers, ...).
+# A section runs from one "## " heading to the next; its rendered body
+# elements are cached by a hash of its source lines and spliced into later
+# documents as copies instead of being parsed and rendered again.
+SECTION_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class SectionCache:
+    """LRU cache of rendered section fragments, bounded by serialized size."""
+
+    def __init__(self, max_bytes=SECTION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return (elements, link urls) for key, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(self, key, elements, urls=()):
+        """Store copies of elements; ``urls`` are their hyperlink targets."""
+        size = sum(len(etree.tostring(el)) for el in elements)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[2]
+        fragment = tuple(deepcopy(el) for el in elements)
+        self._entries[key] = (fragment, tuple(urls), size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+SECTION_CACHE = SectionCache()
+
+
+def iter_sections(lines):
+    """Group lines into sections, each starting at a "## " heading line."""
+    section = []
+    for line in lines:
+        # Same condition as a level-2 HEADING token from classify_line
+        if section and line.startswith("## ") and len(line) > 3:
+            yield section
+            section = []
+        section.append(line)
+    if section:
+        yield section
+
+
+def render_sections(doc, source, cache, stats=None, base_dir=None, media_dir=None):
+    """Render a source section by section, reusing fragments from cache."""
+    ctx = DocxContext(doc, stats, base_dir, media_dir)
+    for section in iter_sections(iter_source_lines(source)):
+        key = hashlib.sha1("\n".join(section).encode("utf-8")).digest()
+        if stats is not None:
+            stats.counters["sections"] += 1
+
+        cached = cache.get(key)
+        if cached is not None:
+            fragment, urls = cached
+            copies = [deepcopy(el) for el in fragment]
+            if urls:
+                # Relationship ids belong to the document that rendered the
+                # section; re-add each link to this one.
+                links = [hl for el in copies for hl in el.iter(qn("w:hyperlink"))]
+                for hl, url in zip(links, urls):
+                    hl.set(qn("r:id"), doc.part.relate_to(url, RT.HYPERLINK, True))
+            for el in copies:
+                ctx.insert(el)
+            if stats is not None:
+                stats.counters["sections.cached"] += 1
+            continue
+
+        mark = ctx.mark()
+        if stats is None:
+            blocks = list(iter_blocks(section))
+        else:
+            start = time.perf_counter()
+            blocks = list(iter_blocks(section, stats))
+            stats.add_span("parse", time.perf_counter() - start)
+        _render_into(ctx, blocks)
+        # Sections with images are not cached, embedded or not: the same text
+        # can point at other files from another directory, at a file that has
+        # changed or appeared, or come from a text source that embeds none.
+        # Their images still come from the media cache.
+        if any(type(block) is Image for block in blocks):
+            continue
+        elements = ctx.inserted_since(mark)
+        rels = doc.part.rels
+        urls = [
+            rels[hl.get(qn("r:id"))].target_ref
+            for el in elements
+            for hl in el.iter(qn("w:hyperlink"))
+        ]
+        cache.put(key, elements, urls)
 
-## Credit Card Processing
 
-- [ ] Current processor name (e.g., Stripe, Square, Heartland, Clover, TransFirst, Worldpay)
-- [ ] Contact name / account rep
-- [ ] Account number or merchant ID
-- [ ] Do you currently use a patient-facing payment portal?
-- [ ] Monthly processing volume (approximate)
+def parse_and_add_line(doc, line, in_table_buffer, table_buffer):
+    """Returns (consumed_table, new_in_table_buffer, new_table_buffer)."""
+    token = classify_line(line)
 
-*Note: We will integrate your existing processor into the patient billing flow, or recommend a switch to Square if that's preferred for better rates/API support.*
+    if token.kind == TABLE_SEP:
+        return False, in_table_buffer, table_buffer
 
----
+    if token.kind == TABLE_ROW:
+        table_buffer.append(token.value)
+        return False, True, table_buffer
 
-## Electronic Billing / Insurance Clearinghouse
+    # Any other line ends the current table
+    if in_table_buffer:
+        flush_table(doc, table_buffer)
+        table_buffer.clear()
 
-- [ ] Clearinghouse currently used (e.g., Availity, Waystar, Change Healthcare, Dental Xchange, ClaimRemedi)
-- [ ] Account login email
-- [ ] Contact name at clearinghouse
-- [ ] Do you process claims directly or through a billing service?
-- [ ] Name of billing service/coordinator if outsourced
+    block = block_from_token(token)
+    if block is not None:
+        render_block(doc, block)
+    return False, False, table_buffer
 
-*Note: We will build automated claim submission and ERA posting into the platform.*
 
----
+def add_inline_bold(para, text):
+    """Add runs with inline markup (see parse_inline) to an existing paragraph."""
+    _import_docx()
+    add_runs(para, parse_inline(text))
 
-## Payroll
 
-- [ ] Payroll provider (e.g., Gusto, ADP, Paychex, QuickBooks Payroll)
-- [ ] Account login email or admin contact
-- [ ] Number of employees (approximate)
-- [ ] Pay frequency (weekly, biweekly, semi-monthly)
+def add_inline_bold_to_para(para, text):
+    add_inline_bold(para, text)
 
-*Note: Payroll integration is Phase 2. We need the vendor now to plan the integration.*
 
----
+def flush_table(doc, table_buffer):
+    if not table_buffer:
+        return
+    render_block(doc, make_table(table_buffer))
 
-## Other Systems (If Applicable)
 
-### Recall / Patient Communication
-- [ ] Any current recall system? (e.g., Solutionreach, Lighthouse 360, Weave, RevenueWell, Demandforce)
-- [ ] If yes: account name, contact
+def process_markdown(doc, source, base_dir=None, media_dir=None):
+    blocks = iter_blocks(iter_source_lines(source))
+    render_blocks(doc, blocks, base_dir=base_dir, media_dir=media_dir)
 
-### Online Scheduling
-- [ ] Do you currently use any online booking tool? (e.g., NexHealth, LocalMed, ZocDoc)
 
-### Reviews / Reputation
-- [ ] Google Business Profile — are you the owner/manager? Can you add Brad as manager?
-- [ ] Yelp Business account access?
+_BASE_DOCUMENT = None
 
-### Phone / Communication
-- [ ] Current phone system (landline, VoIP, etc.)
-- [ ] Provider name (e.g., RingCentral, Weave, 8x8, Vonage, standard POTS)
 
----
+def _prepare_base_document():
+    _import_docx()
+    doc = Document()
 
-## Practice Identifiers (Required for Billing Integration)
+    # Set default font
+    style = doc.styles["Normal"]
+    font = style.font
+    font.name = "Calibri"
+    font.size = Pt(11)
 
-- [ ] Practice NPI (Type 2 — Organization NPI)
-- [ ] Provider NPI(s) — Alex's individual NPI
-- [ ] Tax ID / EIN for the practice entity
-- [ ] Practice legal name (as it appears on insurance contracts)
-- [ ] State dental license number
+    # Set margins
+    for section in doc.sections:
+        section.top_margin = Inches(1)
+        section.bottom_margin = Inches(1)
+        section.left_margin = Inches(1.25)
+        section.right_margin = Inches(1.25)
 
----
+    return doc
+
+
+def new_document():
+    """Return an empty Document with the packet font and margins applied.
+
+    The template is unzipped, parsed and styled once per process; each call
+    returns a deep copy of that prepared document.
+    """
+    global _BASE_DOCUMENT
+    if _BASE_DOCUMENT is None:
+        _BASE_DOCUMENT = _prepare_base_document()
+    return deepcopy(_BASE_DOCUMENT)
+
+
+def render_source(doc, source, stats=None, cache=None, media_dir=None):
+    """Render source at the end of doc's body.
+
+    With a SectionCache as ``cache``, unchanged sections are spliced in from
+    earlier renders instead of being rendered again. Images in a markdown
+    file are found relative to the file and prepared through ``media_dir``.
+    """
+    base_dir = None
+    if isinstance(source, os.PathLike):
+        base_dir = os.path.dirname(os.path.abspath(source))
+    if cache is not None:
+        render_sections(doc, source, cache, stats, base_dir, media_dir)
+    elif stats is None:
+        process_markdown(doc, source, base_dir, media_dir)
+    else:
+        blocks = parse_markdown(source, stats)
+        render_blocks(doc, blocks, stats, base_dir, media_dir)
+
+
+def build_doc(source, stats=None, cache=None, media_dir=None):
+    """Render source into a new Document (see render_source)."""
+    doc = new_document()
+    render_source(doc, source, stats, cache, media_dir)
+    return doc
+
+
+def write_doc(
+    source, out, stats=None, cache=None, compression=None, reproducible=False
+):
+    """Render source into out: a file path or a writable binary stream.
+
+    ``compression`` names a COMPRESSION_PRESETS entry; None keeps
+    python-docx's own save. ``reproducible`` is passed to save_package.
+    Prepared images are cached beside out (see media_cache_dir).
+    """
+    doc = build_doc(source, stats, cache, media_cache_dir(out))
+    if stats is None:
+        save_package(doc, out, compression, reproducible)
+        return
 
-## How to Submit
+    start = time.perf_counter()
+    buf = io.BytesIO()
+    save_package(doc, buf, compression, reproducible)
+    data = buf.getvalue()
+    if isinstance(out, (str, os.PathLike)):
+        with open(out, "wb") as f:
+            f.write(data)
+    else:
+        out.write(data)
+    stats.add_span("save", time.perf_counter() - start)
+    stats.counters["bytes_written"] += len(data)
 
-You can simply reply to Brad's email with the items you know, or fill this in as best you can. We will follow up on anything missing. Nothing is urgent — we can gather this over 1-2 conversations.
 
----
+def render_bytes(source, cache=None, compression=None, reproducible=False):
+    """Render source and return the .docx as bytes, without touching disk."""
+    buf = io.BytesIO()
+    write_doc(
+        source, buf, cache=cache, compression=compression, reproducible=reproducible
+    )
+    return buf.getvalue()
 
-*All information provided will be kept strictly confidential and used only for the purpose of platform integration.*
-"""
 
 # ---------------------------------------------------------------------------
-# Document 3: WEBSITE-STATUS.docx
+# Bundles
 # ---------------------------------------------------------------------------
-WEBSITE_STATUS_MD = r"""# AK Ultimate Dental — Website & Platform Status
-**As of:** February 2026
-**Prepared by:** Brad Palubicki, NuStack Digital Ventures
-
----
-
-## Website: What's Live
-
-The new AK Ultimate Dental website has been fully built and is live at the Vercel preview URL. It is ready to go live on the production domain (akultimatedental.com) whenever Alex gives the green light.
-
-### Pages Built
-
-| Page | URL | Status |
-|------|-----|--------|
-| Homepage | / | Live |
-| About | /about | Live |
-| Services (all) | /services | Live |
-| Individual service pages | /services/[service] | Live (20+ services) |
-| Technology | /technology | Live |
-| Blog | /blog | Live (12 articles) |
-| Reviews | /reviews | Live |
-| Contact | /contact | Live |
-| Appointment Request | /appointment | Live |
-| FAQs | /faqs | Live |
-| Patient Portal | /patient-portal | Live |
-| Dentist Las Vegas | /dentist-las-vegas | Live |
-| Careers | /careers | Live |
-| Dr. Scott Miller Retirement | /dr-scott-miller-retirement | Live |
-
-### Technical Stack
-- **Framework**: Next.js 16 (App Router) — fast, SEO-optimized
-- **Hosting**: Vercel (CDN, automatic HTTPS, global edge network)
-- **Images**: Professional dental photography via Next.js Image optimization
-- **SEO**: Full schema markup (LocalBusiness, MedicalProcedure, FAQ, Article, BreadcrumbList)
-- **Performance**: Lighthouse score 90+ target
-- **Mobile**: Fully responsive for all devices
-
----
-
-## SEO: What's Built In
-
-### Structured Data (Schema.org)
-Every page has proper JSON-LD markup for:
-- Local Business (practice name, address, phone, hours, geo coordinates)
-- Aggregate Rating (Google review count + score)
-- Medical Procedure (for each service page)
-- FAQ (for FAQ pages)
-- Article (for blog posts)
-- Breadcrumb navigation
-
-### Metadata
-- Unique title tags and meta descriptions for every page
-- Open Graph tags for social sharing and AI search (ChatGPT, Perplexity)
-- Canonical URLs
-- Sitemap (auto-generated)
-
-### Content
-- 12 blog articles written targeting high-value Las Vegas dental search terms
-- Service pages with full procedure descriptions
-- FAQs targeting "People Also Ask" Google results
-- 301 redirects from all old site URLs (so existing rankings transfer)
-
----
-
-## Dental Engine: What's Built
-
-The backend SaaS platform powering the practice operations:
-
-| Feature | Status |
-|---------|--------|
-| Patient intake forms | Complete |
-| Online appointment requests | Complete |
-| Appointment types + scheduling | Complete |
-| Provider availability management | Complete |
-| Clinical notes (AI-assisted) | Complete |
-| Dental charting | Complete |
-| CDT code library (31 codes) | Complete |
-| Lab case tracking | Complete |
-| Patient consent forms | Complete |
-| Recall system (automated) | Complete |
-| Assessment tools | Complete |
-| Dashboard (admin + provider views) | Complete |
-| Role-based access control | Complete |
-| Outreach / patient communications | Complete |
-
-### Still To Build (Phase 2)
-- Dentrix PMS integration (needs API credentials)
-- Insurance billing / clearinghouse integration
-- Credit card processing integration
-- Payroll integration
-- Patient portal full features
-
----
-
-## Domain Cutover Plan
-
-When ready to go live on akultimatedental.com:
-
-1. Add Brad as contributor in Vercel (or we handle DNS change together)
-2. Update Vercel project domain settings
-3. Change DNS at domain registrar to point to Vercel
-4. SSL certificate auto-provisions (takes < 5 minutes)
-5. Old site 301 redirects fire automatically — all existing Google rankings transfer
-6. Google Search Console: submit new sitemap
-
-**Estimated downtime:** Near zero (< 60 seconds for DNS propagation edge cases)
-
----
-
-## What's NOT Changing
-
-- Phone number stays the same
-- Address stays the same
-- All existing patient reviews stay visible on Google/Yelp
-- The brand name and visual identity are preserved and enhanced
-- Existing URL paths from the old site redirect automatically to new pages
-
----
-
-*The site is ready. The platform is ready. We're waiting on your go-ahead.*
-"""
+# Separate packets each carry the same styles, numbering, theme and settings
+# parts (about 30 KB compressed). A bundle renders several sources into one
+# document, each starting a new section, so those parts are written once.
+def build_bundle(sources, cache=None, media_dir=None):
+    """Render sources one after another into a new Document."""
+    doc = new_document()
+    ctx = DocxContext(doc)
+    for i, source in enumerate(sources):
+        if i:
+            _render_section_break(ctx, SectionBreak())
+        render_source(doc, source, cache=cache, media_dir=media_dir)
+    return doc
+
+
+def write_bundle(sources, out, cache=None, compression=None, reproducible=False):
+    """Render sources into one .docx at out (path or binary stream)."""
+    doc = build_bundle(sources, cache, media_cache_dir(out))
+    save_package(doc, out, compression, reproducible)
+
 
 # ---------------------------------------------------------------------------
-# Document 4: EMAIL-DRAFT.docx  (with real values substituted)
+# Package compression
 # ---------------------------------------------------------------------------
-EMAIL_DRAFT_MD = r"""# Email Draft — Alex Chireau DDS
-**To:** akultimatedentalpc@yahoo.com
-**From:** brad@nustack.digital
-**Subject:** Ready to Move Forward — Partnership Overview + Next Steps
-
----
-
-Hi Alex,
-
-Hope things are going well at the practice. I wanted to reach out because I think we're at the point where it makes sense to move forward, and I want to make sure I give you everything you need to make that decision.
-
-Since we last spoke, a lot has been accomplished. The AK Ultimate Dental website is fully built — every page, every service, the blog, reviews integration, the works. The backend platform (Dental Engine) is also built out with scheduling, clinical notes, charting, patient communications, and more. I've attached a full status document so you can see exactly where everything stands.
-
----
-
-**The Opportunity**
-
-Here's what I'm proposing, and I want to be straightforward about the structure so there's no ambiguity:
-
-- The investment is **$20,000** into Dental Engine specifically — not NuStack as a whole
-- Ken and I are each putting in $20,000 as well — so we're at $60K total to get this to market
-- In return, you'd receive **equity ownership in Dental Engine** and share in its **profitability as it grows**
-- This is the ground floor — we're at the test clinic stage now, and the upside is significant as we scale to other dental practices
+# python-docx deflates every part at zlib's default level. A preset instead
+# picks (method, level) per kind of part: "media" (images and other
+# already-compressed binaries), "document" (word/document.xml, the bulk of a
+# packet) and "other" (styles, numbering, rels, ...). "fast" is for bulk
+# exports where CPU matters more than size, "archive" for the reverse.
+# zipfile's method numbers; zipfile itself is only imported to write.
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+MEDIA_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".tif", ".tiff", ".wdp")
+
+COMPRESSION_PRESETS = {
+    "default": None,
+    "fast": {
+        "media": (ZIP_STORED, None),
+        "document": (ZIP_DEFLATED, 1),
+        "other": (ZIP_DEFLATED, 1),
+    },
+    "archive": {
+        # Even JPEGs shrink a little further (the template's thumbnail is
+        # mostly blank), and archival output is written once.
+        "media": (ZIP_DEFLATED, 9),
+        "document": (ZIP_DEFLATED, 9),
+        "other": (ZIP_DEFLATED, 9),
+    },
+    "store": {
+        "media": (ZIP_STORED, None),
+        "document": (ZIP_STORED, None),
+        "other": (ZIP_STORED, None),
+    },
+}
+
+
+def part_kind(membername):
+    """Which COMPRESSION_PRESETS key applies to a zip member."""
+    if membername == "word/document.xml":
+        return "document"
+    if membername.startswith("word/media/") or membername.lower().endswith(
+        MEDIA_EXTENSIONS
+    ):
+        return "media"
+    return "other"
+
+
+def compression_preset(name):
+    try:
+        return COMPRESSION_PRESETS[name or "default"]
+    except KeyError:
+        raise ValueError(
+            f"unknown compression {name!r}; "
+            f"expected one of {', '.join(COMPRESSION_PRESETS)}"
+        ) from None
+
+
+# What python-docx's own save does, for reproducible saves without a preset.
+_DEFAULT_PRESET = {
+    "media": (ZIP_DEFLATED, None),
+    "document": (ZIP_DEFLATED, None),
+    "other": (ZIP_DEFLATED, None),
+}
+
+
+class _PresetZipWriter:
+    """PhysPkgWriter stand-in that compresses each part per a preset.
+
+    With ``date_time`` set, parts are held until close and then written in
+    member_order with that timestamp and fixed attributes.
+    """
+
+    def __init__(self, pkg_file, preset, date_time=None):
+        import zipfile
+
+        self._zipf = zipfile.ZipFile(pkg_file, "w")
+        self._preset = preset
+        self._date_time = date_time
+        self._held = []
+
+    def write(self, pack_uri, blob):
+        name = pack_uri.membername
+        if self._date_time is not None:
+            self._held.append((name, blob))
+            return
+        method, level = self._preset[part_kind(name)]
+        self._zipf.writestr(name, blob, compress_type=method, compresslevel=level)
+
+    def close(self):
+        from zipfile import ZipInfo
+
+        for name, blob in sorted(self._held, key=lambda item: member_order(item[0])):
+            info = ZipInfo(name, self._date_time)
+            info.create_system = 0  # not the host OS, which ZipInfo records
+            info.external_attr = 0
+            info.compress_type, level = self._preset[part_kind(name)]
+            self._zipf.writestr(info, blob, compresslevel=level)
+        self._zipf.close()
+
+
+def save_package(doc, out, compression=None, reproducible=False):
+    """Save doc to out (path or binary stream) with a compression preset.
+
+    A ``reproducible`` save gives the same bytes for the same document on
+    every run and machine; see reproducible_timestamps.
+    """
+    preset = compression_preset(compression)
+    if preset is None and not reproducible:
+        doc.save(out)
+        return
 
----
+    if reproducible and not isinstance(out, (str, os.PathLike)) and not (
+        getattr(out, "seekable", None) and out.seekable()
+    ):
+        # zipfile adds data descriptors on unseekable streams such as pipes;
+        # buffer so stdout gets the same bytes as a file would.
+        buf = io.BytesIO()
+        save_package(doc, buf, compression, reproducible)
+        out.write(buf.getvalue())
+        return
 
-**What You'd Actually Have to Do**
+    from docx.opc.pkgwriter import PackageWriter
 
-I know this was your question — and the honest answer is: not much.
+    date_time = None
+    if reproducible:
+        date_time, stamp = reproducible_timestamps()
+        if stamp is not None:
+            doc.core_properties.created = doc.core_properties.modified = stamp
 
-1. **Be the face of it.** A couple short video testimonials, permission to use your name and credentials in our marketing ("Built with AK Ultimate Dental, Las Vegas"), and occasional availability for a reference call with a prospective client. That's maybe 2-4 hours a quarter total.
+    # Same steps as OpcPackage.save, with our zip writer in place of
+    # python-docx's fixed-deflate one.
+    package = doc.part.package
+    parts = list(package.parts)
+    for part in parts:
+        part.before_marshal()
+    writer = _PresetZipWriter(out, preset or _DEFAULT_PRESET, date_time)
+    PackageWriter._write_content_types_stream(writer, parts)
+    PackageWriter._write_pkg_rels(writer, package.rels)
+    PackageWriter._write_parts(writer, parts)
+    writer.close()
 
-2. **Let us use AK Dental as the live platform.** Your practice runs on Dental Engine. Your staff uses the tools. When something needs improvement, you tell us. We fix it. You and your team never have to manage any of the technology — that's entirely on us.
 
-That's it. No sales. No management. No operational headaches. You run your practice, and the platform runs in the background.
+# ---------------------------------------------------------------------------
+# Reproducible output
+# ---------------------------------------------------------------------------
+# Two saves of one document differ only in their zip entry timestamps: the
+# template's core properties carry fixed dates. Reproducible saves pin those
+# timestamps and the entry order, so unchanged documents keep unchanged bytes
+# and their content hashes (CONTENT_INDEX_NAME) can drive caching and uploads.
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
 
----
 
-**What I Need From You to Get Started**
+def reproducible_timestamps():
+    """(zip date_time, core properties datetime or None) for reproducible saves.
 
-To complete the platform integrations for AK Dental, I need some vendor information — specifically around your practice management system (I believe you're using Dentrix), credit card processing, and billing setup. I've attached a simple checklist. You don't need to fill it all out at once — even a partial response gets us moving.
+    SOURCE_DATE_EPOCH, the reproducible-builds convention, sets both;
+    otherwise entries get the zip epoch and core properties keep the
+    template's dates.
+    """
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if not epoch:
+        return ZIP_EPOCH, None
+    from datetime import datetime, timezone
 
-In parallel, I'll have the operating agreement drafted for attorney review. I want everything properly documented so this is a clean, protected relationship for both of us.
+    stamp = datetime.fromtimestamp(int(epoch), timezone.utc).replace(tzinfo=None)
+    return max(ZIP_EPOCH, stamp.timetuple()[:6]), stamp
 
----
 
-**Attached Documents**
+def member_order(name):
+    """Sort key for zip members: [Content_Types].xml first, then by name."""
+    return name != "[Content_Types].xml", name
 
-1. **Partnership Outline** — Full structure of the deal, Alex's role, capital allocation, timeline
-2. **Vendor Information Request** — What we need from you to complete the integrations
-3. **Website & Platform Status** — Full rundown of everything that's been built
 
----
+def content_hash(path):
+    """sha256 hex digest of a file's bytes."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
-**Next Steps**
 
-1. Let me know if the $20K investment and the structure makes sense for you
-2. Send back the vendor info sheet (or just reply with what you know)
-3. I'll get the operating agreement drafted and over to you
-4. We'll schedule a call to walk through anything you want to review in detail
+# ---------------------------------------------------------------------------
+# Incremental builds
+# ---------------------------------------------------------------------------
+def source_hash(source):
+    """Hash of a document's inputs: its markdown plus the generator version.
+
+    For markdown files the content of every embedded image is included, so
+    replacing an image makes the document stale. Returns None for line
+    iterators, which cannot be read twice; those documents are always
+    regenerated.
+    """
+    h = hashlib.sha256(GENERATOR_VERSION.encode())
+    h.update(b"\0")
+    if isinstance(source, os.PathLike):
+        with open(source, "rb") as f:
+            data = f.read()
+        h.update(data)
+        base_dir = os.path.dirname(os.path.abspath(source))
+        for path in image_refs(data.decode("utf-8", "replace")):
+            try:
+                digest = file_digest(resolve_image(path, base_dir))
+            except ImageError:
+                digest = "-"  # fails or falls back now; may not later
+            h.update(f"\0{path}\0{digest}".encode("utf-8"))
+    elif isinstance(source, str):
+        h.update(source.encode("utf-8"))
+    else:
+        return None
+    return h.hexdigest()
+
+
+def manifest_digest(source, compression=None, reproducible=False):
+    """The manifest entry for source rendered with the given save options.
+
+    Output written with another compression preset, or not reproducibly,
+    has different bytes, so it must not count as up to date.
+    """
+    digest = source_hash(source)
+    if digest is None:
+        return None
+    if compression not in (None, "default"):
+        digest += f"+{compression}"
+    if reproducible:
+        digest += "+reproducible"
+    return digest
+
+
+def load_manifest(output_dir, name=MANIFEST_NAME):
+    """Return {filename: source_hash} from output_dir's manifest, or {}.
+
+    With ``name=CONTENT_INDEX_NAME`` it reads the content index instead:
+    {filename: content_hash} of reproducible output.
+    """
+    try:
+        with open(os.path.join(output_dir, name), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def save_manifest(output_dir, manifest, name=MANIFEST_NAME):
+    path = os.path.join(output_dir, name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(manifest, output_dir, filename, digest):
+    if digest is None:
+        return False
+    return manifest.get(filename) == digest and os.path.exists(
+        os.path.join(output_dir, filename)
+    )
+
+
+def create_doc(source, filename, force=False):
+    """Render one document into OUTPUT_DIR, skipping it if nothing changed.
+
+    Stats are collected and passed to the registered hooks when there are any.
+    """
+    out_path = os.path.join(OUTPUT_DIR, filename)
+    digest = manifest_digest(source)
+    manifest = load_manifest(OUTPUT_DIR)
+    if not force and is_up_to_date(manifest, OUTPUT_DIR, filename, digest):
+        print(f"Unchanged: {out_path}")
+        return out_path
+
+    stats = DocStats(filename) if STATS_HOOKS else None
+    write_doc(source, out_path, stats, SECTION_CACHE)
+    print(f"Saved: {out_path}")
+    if stats is not None:
+        _emit_stats(stats)
 
-Alex, I genuinely believe this is a great opportunity — and more importantly, I think you're the right partner for this. Your credentials, your reputation in Las Vegas, and the practice you've built give Dental Engine instant credibility in the market. That's worth a lot.
+    if digest is not None:
+        manifest[filename] = digest
+        save_manifest(OUTPUT_DIR, manifest)
+    return out_path
 
-Let me know your thoughts. Happy to jump on a call anytime.
 
-Brad
-brad@nustack.digital
-(608) 215-3940
+# ---------------------------------------------------------------------------
+# Batch generation
+# ---------------------------------------------------------------------------
+DocResult = namedtuple(
+    "DocResult",
+    ["filename", "path", "seconds", "size", "error", "skipped", "stats", "digest"],
+)
+DocResult.__new__.__defaults__ = (False, None, None)
+
+
+def render_job(
+    source,
+    filename,
+    output_dir,
+    collect_stats=False,
+    profile_dir=None,
+    compression=None,
+    reproducible=False,
+):
+    """Render one document to output_dir and return a DocResult.
+
+    Errors are captured in the result instead of raised, so one bad document
+    does not take down the rest of a batch. With ``collect_stats`` the result
+    carries a DocStats; with ``profile_dir`` the render runs under cProfile
+    and its stats are dumped to ``<profile_dir>/<filename>.prof``. A
+    ``reproducible`` render carries the content_hash of its output.
+    """
+    out_path = os.path.join(output_dir, filename)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    stats = DocStats(filename) if collect_stats else None
+    profiler = None
+    if profile_dir:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    start = time.perf_counter()
+    try:
+        write_doc(source, out_path, stats, SECTION_CACHE, compression, reproducible)
+        size = os.path.getsize(out_path)
+        digest = content_hash(out_path) if reproducible else None
+    except Exception:
+        return DocResult(
+            filename, out_path, time.perf_counter() - start, 0, traceback.format_exc()
+        )
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(profile_dir, filename + ".prof"))
+    return DocResult(
+        filename,
+        out_path,
+        time.perf_counter() - start,
+        size,
+        None,
+        stats=stats,
+        digest=digest,
+    )
+
+
+def create_docs(
+    jobs,
+    workers=None,
+    output_dir=None,
+    force=False,
+    stats=False,
+    profile_dir=None,
+    compression=None,
+    reproducible=False,
+):
+    """Render many (source, filename) jobs across a process pool.
+
+    Sources are markdown text or paths; paths are cheap to send to workers,
+    which read the file themselves. ``workers`` defaults to the CPU count;
+    ``workers=1`` renders in-process. Documents whose source hash matches the
+    manifest and whose output file still exists are skipped unless ``force``
+    is set. Stats are collected when ``stats`` is set or hooks are
+    registered; ``profile_dir`` dumps a cProfile file per document.
+    ``compression`` is a COMPRESSION_PRESETS name. ``reproducible`` output
+    is content-hashed into output_dir's CONTENT_INDEX_NAME, and re-rendered
+    documents whose bytes did not change are reported as identical. Returns
+    one DocResult per job, in job order.
+    """
+    compression_preset(compression)  # fail fast on unknown names
+    collect_stats = bool(stats or STATS_HOOKS)
+    job_options = (collect_stats, profile_dir, compression, reproducible)
+    from concurrent.futures import ProcessPoolExecutor
+
+    output_dir = output_dir or OUTPUT_DIR
+    jobs = list(jobs)
+    manifest = load_manifest(output_dir)
+    digests = [manifest_digest(md, compression, reproducible) for md, _ in jobs]
+    content_index = {}
+    if reproducible:
+        content_index = load_manifest(output_dir, CONTENT_INDEX_NAME)
+
+    results = [None] * len(jobs)
+    pending = []
+    for i, ((_, name), digest) in enumerate(zip(jobs, digests)):
+        if not force and is_up_to_date(manifest, output_dir, name, digest):
+            path = os.path.join(output_dir, name)
+            results[i] = DocResult(
+                name, path, 0.0, os.path.getsize(path), None, skipped=True
+            )
+        else:
+            pending.append(i)
+
+    if workers == 1 or len(pending) <= 1:
+        for i in pending:
+            md, name = jobs[i]
+            results[i] = render_job(md, name, output_dir, *job_options)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                (
+                    i,
+                    pool.submit(
+                        render_job, jobs[i][0], jobs[i][1], output_dir, *job_options
+                    ),
+                )
+                for i in pending
+            ]
+            for i, future in futures:
+                try:
+                    results[i] = future.result()
+                except Exception:
+                    # The worker itself died (e.g. BrokenProcessPool)
+                    name = jobs[i][1]
+                    path = os.path.join(output_dir, name)
+                    results[i] = DocResult(
+                        name, path, 0.0, 0, traceback.format_exc()
+                    )
+
+    for result, digest in zip(results, digests):
+        if result.skipped:
+            print(f"Unchanged: {result.path}")
+        elif result.error:
+            manifest.pop(result.filename, None)
+            content_index.pop(result.filename, None)
+            print(f"FAILED: {result.path}\n{result.error}")
+        else:
+            if digest is not None:
+                manifest[result.filename] = digest
+            same = result.digest and content_index.get(result.filename) == result.digest
+            if result.digest:
+                content_index[result.filename] = result.digest
+            print(
+                f"Saved: {result.path} "
+                f"({result.seconds:.2f}s, {result.size / 1024:.1f} KB"
+                f"{', identical' if same else ''})"
+            )
+            if result.stats is not None:
+                _emit_stats(result.stats)
+    if pending:
+        save_manifest(output_dir, manifest)
+        if reproducible:
+            save_manifest(output_dir, content_index, CONTENT_INDEX_NAME)
+    return results
 
----
 
-*Attachments: Partnership-Outline.pdf | Vendor-Info-Request.pdf | Website-Platform-Status.pdf*
-"""
+# ---------------------------------------------------------------------------
+# Directory trees
+# ---------------------------------------------------------------------------
+# Directories never worth walking for documentation (dot-directories such as
+# .git and .next are skipped as well).
+SKIP_DIRS = frozenset(["node_modules", "__pycache__", "venv", "dist", "build"])
+
+
+def iter_markdown_tree(src_dir, skip=()):
+    """Yield (path, relative .docx filename) for each .md file under src_dir.
+
+    Files come in a stable (sorted) order. Directories named in SKIP_DIRS or
+    starting with a dot are not entered, nor are the paths in ``skip``
+    (e.g. an output directory inside the tree).
+    """
+    src_dir = Path(src_dir)
+    skip = {os.path.realpath(p) for p in skip}
+    for root, dirs, files in os.walk(src_dir):
+        dirs[:] = sorted(
+            d
+            for d in dirs
+            if d not in SKIP_DIRS
+            and not d.startswith(".")
+            and os.path.realpath(os.path.join(root, d)) not in skip
+        )
+        for name in sorted(files):
+            if name.lower().endswith(".md"):
+                path = Path(root, name)
+                yield path, path.relative_to(src_dir).with_suffix(".docx").as_posix()
+
+
+def convert_tree(
+    src_dir, out_dir, workers=None, force=False, compression=None, reproducible=False
+):
+    """Convert every .md under src_dir into a mirrored .docx tree in out_dir.
+
+    Files render in parallel and unchanged ones are skipped, as in
+    create_docs. Prints a throughput summary and returns the DocResults.
+    """
+    jobs = list(iter_markdown_tree(src_dir, skip=[out_dir]))
+    start = time.perf_counter()
+    results = create_docs(
+        jobs,
+        workers=workers,
+        output_dir=out_dir,
+        force=force,
+        compression=compression,
+        reproducible=reproducible,
+    )
+    wall = time.perf_counter() - start
+
+    rendered = [
+        (result, source)
+        for result, (source, _) in zip(results, jobs)
+        if not result.skipped and not result.error
+    ]
+    failed = sum(1 for r in results if r.error)
+    md_bytes = sum(os.path.getsize(source) for _, source in rendered)
+    docx_bytes = sum(result.size for result, _ in rendered)
+    print(
+        f"{len(results)} files: {len(rendered)} rendered, "
+        f"{len(results) - len(rendered) - failed} unchanged, {failed} failed "
+        f"in {wall:.2f}s"
+    )
+    if rendered and wall > 0:
+        print(
+            f"  {len(rendered) / wall:.1f} docs/s, "
+            f"{md_bytes / 1024 / wall:.1f} KB/s markdown in, "
+            f"{docx_bytes / 1024:.0f} KB .docx out"
+        )
+    return results
 
 
-def create_doc(markdown_text, filename):
-    doc = Document()
+# ---------------------------------------------------------------------------
+# Watch mode
+# ---------------------------------------------------------------------------
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _source_stamp(path, images=()):
+    """Stamp of a markdown file and its images; None while it is missing."""
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return None
+    return (stamp, *(_file_stamp(image) for image in images))
+
+
+def watch(
+    jobs,
+    output_dir=None,
+    interval=0.2,
+    debounce=0.3,
+    compression=None,
+    reproducible=False,
+):
+    """Re-render documents as their markdown files change, until Ctrl+C.
+
+    Only (path, filename) jobs can be watched. Files, and the image files
+    they embed, are polled every ``interval`` seconds; a document is rebuilt
+    once they have been quiet for ``debounce`` seconds, so a burst of saves
+    triggers a single render.
+    The prepared template and compiled tokenizer stay loaded between renders.
+    ``compression`` and ``reproducible`` are passed on to create_docs, so
+    rebuilds keep the manifest and content index of the initial build.
+    """
+    output_dir = output_dir or OUTPUT_DIR
+    jobs = [(src, name) for src, name in jobs if isinstance(src, os.PathLike)]
+    new_document()  # warm the template cache before the first edit
+
+    images = {src: embedded_images(src) for src, _ in jobs}
+    stamps = {src: _source_stamp(src, images[src]) for src, _ in jobs}
+    changed_at = {}
+    print(f"Watching {len(jobs)} documents for changes (Ctrl+C to stop)...")
+    try:
+        while True:
+            time.sleep(interval)
+            now = time.perf_counter()
+            for src, _ in jobs:
+                stamp = _source_stamp(src, images[src])
+                if stamp != stamps[src]:
+                    # The edit may have added or removed image references
+                    images[src] = embedded_images(src)
+                    stamps[src] = _source_stamp(src, images[src])
+                    changed_at[src] = now
+
+            ready = [
+                (src, name)
+                for src, name in jobs
+                if src in changed_at
+                and now - changed_at[src] >= debounce
+                and stamps[src] is not None  # mid-save or deleted
+            ]
+            if not ready:
+                continue
+            first_change = min(changed_at.pop(src) for src, _ in ready)
+            create_docs(
+                ready,
+                workers=1,
+                output_dir=output_dir,
+                compression=compression,
+                reproducible=reproducible,
+            )
+            latency = time.perf_counter() - first_change
+            print(f"Rebuilt {len(ready)} document(s), {latency:.2f}s after change.")
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+BUNDLE_FILENAME = "PARTNER-PACKET.docx"
+
+DOCUMENTS = [
+    (Path(OUTPUT_DIR, "PARTNERSHIP-OUTLINE.md"), "PARTNERSHIP-OUTLINE.docx"),
+    (Path(OUTPUT_DIR, "VENDOR-INFO-REQUEST.md"), "VENDOR-INFO-REQUEST.docx"),
+    (Path(OUTPUT_DIR, "WEBSITE-STATUS.md"), "WEBSITE-STATUS.docx"),
+    (Path(OUTPUT_DIR, "EMAIL-DRAFT.md"), "EMAIL-DRAFT.docx"),
+]
 
-    # Set default font
-    style = doc.styles["Normal"]
-    font = style.font
-    font.name = "Calibri"
-    font.size = Pt(11)
 
-    # Set margins
-    for section in doc.sections:
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-        section.left_margin = Inches(1.25)
-        section.right_margin = Inches(1.25)
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+def find_document(name):
+    """Return the DOCUMENTS job for a packet name, .md or .docx filename."""
+    for source, filename in DOCUMENTS:
+        stem = os.path.splitext(filename)[0]
+        if name in (stem, filename, source.name):
+            return source, filename
+    return None
+
+
+def _cmd_list(args):
+    manifest = load_manifest(OUTPUT_DIR)
+    for source, filename in DOCUMENTS:
+        if not os.path.exists(source):
+            status = "missing source"
+        elif is_up_to_date(
+            manifest,
+            OUTPUT_DIR,
+            filename,
+            manifest_digest(source, args.compression, args.reproducible),
+        ):
+            status = "up to date"
+        else:
+            status = "stale"
+        print(f"{os.path.splitext(filename)[0]:<24} {source.name:<28} {status}")
+    return 0
+
+
+def _cmd_render(args):
+    job = find_document(args.source)
+    if job is not None:
+        source, filename = job
+    else:
+        source = Path(args.source)
+        filename = source.with_suffix(".docx").name
+    if not os.path.exists(source):
+        print(f"No such document or file: {args.source}", file=sys.stderr)
+        return 2
+
+    out = sys.stdout.buffer if args.output == "-" else None
+    out_path = args.output or os.path.join(OUTPUT_DIR, filename)
+    if args.stream:
+        # Memory-bounded: blocks and table chunks are written as parsed
+        import ooxml_writer
+
+        ooxml_writer.write_docx(
+            source,
+            out or out_path,
+            compression=args.compression,
+            table_chunk_bytes=args.table_chunk_kb * 1024,
+            reproducible=args.reproducible,
+        )
+    else:
+        write_doc(
+            source,
+            out or out_path,
+            cache=None if out else SECTION_CACHE,
+            compression=args.compression,
+            reproducible=args.reproducible,
+        )
 
-    process_markdown(doc, markdown_text)
+    if out is not None:
+        out.flush()
+    else:
+        print(f"Saved: {out_path}")
+    return 0
+
+
+def _cmd_batch(args):
+    if args.stats:
+        add_stats_hook(lambda stats: print(f"  {stats.summary()}"))
+
+    wall_start = time.perf_counter()
+    results = create_docs(
+        DOCUMENTS,
+        workers=args.workers,
+        force=args.force,
+        profile_dir=args.profile,
+        compression=args.compression,
+        reproducible=args.reproducible,
+    )
+    failed = [r for r in results if r.error]
+    wall = time.perf_counter() - wall_start
+    if failed:
+        print(f"{len(failed)} of {len(results)} documents failed ({wall:.2f}s).")
+    else:
+        skipped = sum(1 for r in results if r.skipped)
+        print(
+            f"All {len(results)} documents created successfully "
+            f"({skipped} unchanged, {wall:.2f}s)."
+        )
 
-    out_path = os.path.join(OUTPUT_DIR, filename)
-    doc.save(out_path)
-    print(f"Saved: {out_path}")
+    if args.watch:
+        watch(
+            DOCUMENTS, compression=args.compression, reproducible=args.reproducible
+        )
+    return 1 if failed else 0
+
+
+def _cmd_tree(args):
+    if not os.path.isdir(args.src_dir):
+        print(f"Not a directory: {args.src_dir}", file=sys.stderr)
+        return 2
+    results = convert_tree(
+        args.src_dir,
+        args.out_dir,
+        workers=args.workers,
+        force=args.force,
+        compression=args.compression,
+        reproducible=args.reproducible,
+    )
+    return 1 if any(r.error for r in results) else 0
+
+
+def _cmd_bundle(args):
+    sources = []
+    for name in args.sources or [filename for _, filename in DOCUMENTS]:
+        job = find_document(name)
+        source = job[0] if job is not None else Path(name)
+        if not os.path.exists(source):
+            print(f"No such document or file: {name}", file=sys.stderr)
+            return 2
+        sources.append(source)
+
+    out_path = args.output or os.path.join(OUTPUT_DIR, BUNDLE_FILENAME)
+    start = time.perf_counter()
+    if args.stream:
+        import ooxml_writer
+
+        ooxml_writer.write_bundle(
+            sources,
+            out_path,
+            compression=args.compression,
+            reproducible=args.reproducible,
+        )
+    else:
+        write_bundle(
+            sources,
+            out_path,
+            cache=SECTION_CACHE,
+            compression=args.compression,
+            reproducible=args.reproducible,
+        )
+    print(
+        f"Saved: {out_path} ({len(sources)} documents, "
+        f"{os.path.getsize(out_path) / 1024:.1f} KB, "
+        f"{time.perf_counter() - start:.2f}s)"
+    )
+    return 0
+
+
+def _add_compression_option(parser):
+    parser.add_argument(
+        "--compression",
+        choices=list(COMPRESSION_PRESETS),
+        default="default",
+        help="zip compression preset: fast for bulk exports, archive for "
+        "smallest files (default: python-docx's own)",
+    )
+
+
+def _add_reproducible_option(parser):
+    parser.add_argument(
+        "--reproducible",
+        action="store_true",
+        help="byte-identical output for identical input: fixed timestamps "
+        "(SOURCE_DATE_EPOCH if set) and entry order",
+    )
+
+
+def main(argv=None):
+    import argparse
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # No command (or only options) means batch, as before subcommands existed
+    if not argv or argv[0].startswith("-") and argv[0] not in ("-h", "--help"):
+        argv = ["batch", *argv]
+
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = commands.add_parser("list", help="list packets and their status")
+    # Output built with other save options counts as stale
+    _add_compression_option(list_cmd)
+    _add_reproducible_option(list_cmd)
+    list_cmd.set_defaults(func=_cmd_list)
+
+    render_cmd = commands.add_parser("render", help="render a single document")
+    render_cmd.add_argument("source", help="packet name (see list) or .md path")
+    render_cmd.add_argument(
+        "-o", "--output", help="output .docx path, or - to write to stdout"
+    )
+    render_cmd.add_argument(
+        "--stream",
+        action="store_true",
+        help="write with the streaming backend; memory stays bounded however "
+        "long the document or its tables are",
+    )
+    render_cmd.add_argument(
+        "--table-chunk-kb",
+        type=int,
+        default=1024,
+        help="with --stream, buffer at most about this much of a table "
+        "(default: 1024)",
+    )
+    _add_compression_option(render_cmd)
+    _add_reproducible_option(render_cmd)
+    render_cmd.set_defaults(func=_cmd_render)
+
+    batch_cmd = commands.add_parser("batch", help="render every packet")
+    batch_cmd.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="worker processes (default: CPU count, 1 = no pool)",
+    )
+    batch_cmd.add_argument(
+        "--force",
+        action="store_true",
+        help="regenerate every document even if its source is unchanged",
+    )
+    batch_cmd.add_argument(
+        "--watch",
+        action="store_true",
+        help="after building, keep re-rendering documents whose .md changes",
+    )
+    batch_cmd.add_argument(
+        "--stats",
+        action="store_true",
+        help="print per-document counters and stage timings",
+    )
+    batch_cmd.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="dump cProfile stats for each document into DIR",
+    )
+    _add_compression_option(batch_cmd)
+    _add_reproducible_option(batch_cmd)
+    batch_cmd.set_defaults(func=_cmd_batch)
+
+    tree_cmd = commands.add_parser(
+        "tree", help="convert every .md under a directory into a mirrored tree"
+    )
+    tree_cmd.add_argument("src_dir", help="directory to search for .md files")
+    tree_cmd.add_argument("out_dir", help="where to write the .docx tree")
+    tree_cmd.add_argument(
+        "--workers", type=int, default=None, help="worker processes"
+    )
+    tree_cmd.add_argument(
+        "--force", action="store_true", help="re-render unchanged files too"
+    )
+    _add_compression_option(tree_cmd)
+    _add_reproducible_option(tree_cmd)
+    tree_cmd.set_defaults(func=_cmd_tree)
+
+    bundle_cmd = commands.add_parser(
+        "bundle", help="render several documents into one .docx"
+    )
+    bundle_cmd.add_argument(
+        "sources",
+        nargs="*",
+        help="packet names or .md paths, in order (default: every packet)",
+    )
+    bundle_cmd.add_argument(
+        "-o", "--output", help=f"output .docx path (default: {BUNDLE_FILENAME})"
+    )
+    bundle_cmd.add_argument(
+        "--stream", action="store_true", help="write with the streaming backend"
+    )
+    _add_compression_option(bundle_cmd)
+    _add_reproducible_option(bundle_cmd)
+    bundle_cmd.set_defaults(func=_cmd_bundle)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
 
 
 if __name__ == "__main__":
-    create_doc(PARTNERSHIP_OUTLINE_MD, "PARTNERSHIP-OUTLINE.docx")
-    create_doc(VENDOR_INFO_MD, "VENDOR-INFO-REQUEST.docx")
-    create_doc(WEBSITE_STATUS_MD, "WEBSITE-STATUS.docx")
-    create_doc(EMAIL_DRAFT_MD, "EMAIL-DRAFT.docx")
-    print("All 4 documents created successfully.")
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""
+Stamp out per-practice variants of a packet from one rendered template.
+
+    python merge_docs.py TEMPLATE.md records.csv OUT_DIR
+    python merge_docs.py TEMPLATE.md records.json OUT_DIR --name "{{slug}}.docx"
+    some-export | python merge_docs.py TEMPLATE.md - OUT_DIR   # JSON lines
+
+The template is ordinary packet markdown with ``{{placeholders}}`` in text,
+table cells or link urls. It is parsed and rendered once; the resulting
+XML is split into static bytes and placeholder slots, so each variant is a
+byte join plus a zip write rather than a full render. Records are a CSV
+file (one column per placeholder), a JSON array of objects, or JSON lines.
+"""
+import csv
+import io
+import json
+import os
+import re
+import struct
+import sys
+import time
+import traceback
+import zipfile
+import zlib
+from collections import namedtuple
+from xml.sax.saxutils import escape
+
+import generate_docs as gd
+
+PLACEHOLDER_RE = re.compile(r"\{\{\s*([A-Za-z_][\w.-]*)\s*\}\}")
+_PLACEHOLDER_BYTES_RE = re.compile(PLACEHOLDER_RE.pattern.encode())
+# A <w:t> holding a placeholder; its value may start or end with spaces
+_SLOT_TEXT_RE = re.compile(rb"<w:t>(?=[^<]*\{\{)")
+_TEXT_TAG_RE = re.compile(rb"<w:t[ >]")
+_CONTROL_SPLIT_RE = re.compile(r"([\t\r\n])")
+_REOPEN_T = '</w:t>{}<w:t xml:space="preserve">'
+_UNSAFE_FILENAME_RE = re.compile(r"[^\w.\- ]+")
+BATCH_SIZE = 16
+
+MergeResult = namedtuple("MergeResult", ["index", "path", "size", "error"])
+
+
+def _deflate(data, method, level):
+    """Return data compressed for a zip entry of the given method."""
+    if method == gd.ZIP_STORED:
+        return data
+    if level is None:
+        level = zlib.Z_DEFAULT_COMPRESSION
+    z = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return z.compress(data) + z.flush()
+
+
+def _entry(name, data, method, level):
+    return name, method, zlib.crc32(data), len(data), _deflate(data, method, level)
+
+
+def _write_zip(f, entries, date_time):
+    """Write a zip of (name, method, crc, size, compressed) entries to f.
+
+    The entries are already compressed, so static parts cost a memcpy per
+    variant instead of a deflate; zipfile has no public API for that.
+    """
+    dos_time = date_time[3] << 11 | date_time[4] << 5 | date_time[5] // 2
+    dos_date = (date_time[0] - 1980) << 9 | date_time[1] << 5 | date_time[2]
+    central = []
+    offset = 0
+    for name, method, crc, size, data in entries:
+        name = name.encode("utf-8")
+        fields = (20, 0x800, method, dos_time, dos_date, crc, len(data), size)
+        f.write(struct.pack("<4s5H3L2H", b"PK\x03\x04", *fields, len(name), 0))
+        f.write(name)
+        f.write(data)
+        header = struct.pack(
+            "<4s6H3L5H2L", b"PK\x01\x02", 20, *fields, len(name), 0, 0, 0, 0, 0, offset
+        )
+        central.append(header + name)
+        offset += 30 + len(name) + len(data)
+    directory = b"".join(central)
+    f.write(directory)
+    count = len(central)
+    f.write(
+        struct.pack(
+            "<4s4H2LH", b"PK\x05\x06", 0, 0, count, count, len(directory), offset, 0
+        )
+    )
+
+
+def _split_slots(data):
+    """Split XML into static bytes and (field, in_text) placeholder slots.
+
+    Every <w:t> with a placeholder is made space-preserving, since values
+    may start or end with spaces.
+    """
+    data = _SLOT_TEXT_RE.sub(b'<w:t xml:space="preserve">', data)
+    pieces = []
+    start = 0
+    for m in _PLACEHOLDER_BYTES_RE.finditer(data):
+        in_text = _TEXT_TAG_RE.match(data, max(data.rfind(b"<", 0, m.start()), 0))
+        pieces.append(data[start : m.start()])
+        pieces.append((m.group(1).decode("utf-8"), in_text is not None))
+        start = m.end()
+    pieces.append(data[start:])
+    return pieces
+
+
+def _text_value(value):
+    """Escaped value for run text, tabs and line breaks as their own elements.
+
+    Matches python-docx's Run.text setter, like ooxml_writer's run text.
+    """
+    if "\t" not in value and "\r" not in value and "\n" not in value:
+        return escape(value)
+    out = []
+    for piece in _CONTROL_SPLIT_RE.split(value):
+        if piece == "\t":
+            out.append(_REOPEN_T.format("<w:tab/>"))
+        elif piece in ("\r", "\n"):
+            out.append(_REOPEN_T.format("<w:br/>"))
+        else:
+            out.append(escape(piece))
+    return "".join(out)
+
+
+class MergeTemplate:
+    """A rendered .docx split into static bytes and placeholder slots.
+
+    ``parts`` holds (name, method, level, data) in package order. Parts
+    without placeholders are compressed once and kept as a ready zip entry;
+    XML parts containing placeholders are kept as a list alternating static
+    bytes and (field name, in_text) slots, static bytes at even indices.
+    ``in_text`` slots sit in a run's <w:t>; others are attribute values
+    (link targets in .rels parts) or other element text.
+    """
+
+    def __init__(self, docx_bytes, compression=None):
+        preset = gd.compression_preset(compression)
+        self.parts = []
+        self.fields = set()
+        with zipfile.ZipFile(io.BytesIO(docx_bytes)) as zf:
+            self.date_time = zf.infolist()[0].date_time
+            for name in zf.namelist():
+                data = zf.read(name)
+                if preset is None:
+                    method, level = gd.ZIP_DEFLATED, None
+                else:
+                    method, level = preset[gd.part_kind(name)]
+                if b"{{" in data and name.endswith((".xml", ".rels")):
+                    pieces = _split_slots(data)
+                    self.fields.update(field for field, _ in pieces[1::2])
+                    if len(pieces) > 1:
+                        self.parts.append((name, method, level, pieces))
+                        continue
+                entry = _entry(name, data, method, level)
+                self.parts.append((name, method, level, entry))
+
+    @classmethod
+    def from_markdown(cls, source, compression=None):
+        """Parse and render source once; source is text or a path.
+
+        The template is rendered reproducibly, so equal records give equal
+        variant bytes.
+        """
+        return cls(gd.render_bytes(source, reproducible=True), compression)
+
+    def fill(self, pieces, record):
+        """Return the bytes of one placeholder part filled from record."""
+        chunks = pieces[:]
+        for i in range(1, len(chunks), 2):
+            field, in_text = chunks[i]
+            try:
+                value = record[field]
+            except KeyError:
+                raise KeyError(f"no value for {{{{{field}}}}}") from None
+            value = "" if value is None else str(value)
+            if in_text:
+                value = _text_value(value)
+            else:
+                value = escape(value, {'"': "&quot;"})
+            chunks[i] = value.encode("utf-8")
+        return b"".join(chunks)
+
+    def write(self, record, out):
+        """Write the variant for record to out (path or binary stream)."""
+        entries = []
+        for name, method, level, data in self.parts:
+            if isinstance(data, list):
+                data = _entry(name, self.fill(data, record), method, level)
+            entries.append(data)
+        if isinstance(out, (str, os.PathLike)):
+            with open(out, "wb") as f:
+                _write_zip(f, entries, self.date_time)
+        else:
+            _write_zip(out, entries, self.date_time)
+
+    def render(self, record):
+        """Return the variant for record as .docx bytes."""
+        buf = io.BytesIO()
+        self.write(record, buf)
+        return buf.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Records
+# ---------------------------------------------------------------------------
+def iter_records(path):
+    """Yield dict records from a CSV file, JSON array, JSON lines or "-"."""
+    if path == "-":
+        for line in sys.stdin:
+            if line.strip():
+                yield json.loads(line)
+        return
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+        return
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def variant_filename(pattern, record, index):
+    """Output filename for a record: pattern with placeholders filled."""
+    if pattern is None:
+        return f"variant-{index:04d}.docx"
+
+    def value(m):
+        text = str(record.get(m.group(1), ""))
+        return _UNSAFE_FILENAME_RE.sub("-", text).strip(" .-") or "_"
+
+    name = PLACEHOLDER_RE.sub(value, pattern)
+    return name if name.lower().endswith(".docx") else name + ".docx"
+
+
+# ---------------------------------------------------------------------------
+# Batch merge
+# ---------------------------------------------------------------------------
+_WORKER_TEMPLATE = None
+
+
+def _init_worker(template):
+    global _WORKER_TEMPLATE
+    _WORKER_TEMPLATE = template
+
+
+def _merge_batch(batch, out_dir, name_pattern, template=None):
+    """Write one batch of (index, record); errors are captured per record."""
+    template = template or _WORKER_TEMPLATE
+    results = []
+    for index, record in batch:
+        path = os.path.join(out_dir, variant_filename(name_pattern, record, index))
+        try:
+            template.write(record, path)
+            results.append(MergeResult(index, path, os.path.getsize(path), None))
+        except Exception:
+            results.append(MergeResult(index, path, 0, traceback.format_exc()))
+    return results
+
+
+def _batches(records, size):
+    batch = []
+    for index, record in enumerate(records):
+        batch.append((index, record))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def merge(template, records, out_dir, name_pattern=None, workers=None):
+    """Write a variant of template for every record into out_dir.
+
+    Records are consumed lazily in batches of BATCH_SIZE; at most a few
+    batches per worker are in flight, so a long record stream needs little
+    memory. ``workers=1`` merges in-process. Returns MergeResults in record
+    order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    batches = _batches(records, BATCH_SIZE)
+    results = []
+    if workers == 1:
+        for batch in batches:
+            results += _merge_batch(batch, out_dir, name_pattern, template)
+    else:
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(template,)
+        ) as pool:
+            max_pending = pool._max_workers * 4
+            pending = set()
+            for batch in batches:
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results += future.result()
+                pending.add(
+                    pool.submit(_merge_batch, batch, out_dir, name_pattern)
+                )
+            for future in pending:
+                results += future.result()
+    results.sort(key=lambda r: r.index)
+    return results
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("template", help="markdown template with {{placeholders}}")
+    parser.add_argument("records", help=".csv, .json / JSON lines, or - for stdin")
+    parser.add_argument("out_dir", help="directory for the variants")
+    parser.add_argument(
+        "--name",
+        help='output filename pattern, e.g. "{{slug}}.docx" '
+        "(default: variant-NNNN.docx)",
+    )
+    parser.add_argument("--workers", type=int, help="worker processes")
+    gd._add_compression_option(parser)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    template = MergeTemplate.from_markdown(gd.Path(args.template), args.compression)
+    setup = time.perf_counter() - start
+    print(
+        f"Template: {args.template} ({len(template.fields)} fields: "
+        f"{', '.join(sorted(template.fields))}) rendered in {setup:.2f}s"
+    )
+
+    results = merge(
+        template, iter_records(args.records), args.out_dir, args.name, args.workers
+    )
+    wall = time.perf_counter() - start
+    failed = [r for r in results if r.error]
+    for r in failed:
+        print(f"FAILED: record {r.index} -> {r.path}\n{r.error}")
+    print(
+        f"{len(results) - len(failed)} of {len(results)} variants written to "
+        f"{args.out_dir} in {wall:.2f}s ({len(results) / wall:.0f} docs/s)"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
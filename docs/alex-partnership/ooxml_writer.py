@@ -0,0 +1,467 @@
+"""
+Stream markdown straight into a .docx without building a python-docx tree.
+
+This is an alternative backend for the markdown handled by generate_docs.py.
+Blocks are turned into WordprocessingML as they are parsed and written
+directly into the word/document.xml zip entry, so peak memory does not grow
+with document length. Every other part (styles, numbering, theme, settings,
+section properties) is copied from the prepared template that
+generate_docs.new_document() builds. Images are not embedded: each one is
+written as its alt text, with a warning, like an image generate_docs cannot
+embed.
+
+Run this file to compare both backends on the markdown files next to it:
+
+    python ooxml_writer.py [file.md ...]
+"""
+import glob
+import io
+import os
+import re
+import sys
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+from docx.shared import Emu
+
+import generate_docs as gd
+
+DOCUMENT_PART = "word/document.xml"
+DOCUMENT_RELS_PART = "word/_rels/document.xml.rels"
+CORE_PROPS_PART = "docProps/core.xml"
+HYPERLINK_RELTYPE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+)
+FLUSH_BYTES = 1 << 16
+# Rows of a table are buffered up to about this many bytes before being
+# written, so a table of any length needs a bounded amount of memory.
+TABLE_CHUNK_BYTES = 1 << 20
+
+_CONTROL_SPLIT_RE = re.compile(r"([\t\r\n])")
+_REL_ID_RE = re.compile(rb'Id="(rId\d+)"')
+
+
+class _Template:
+    """Parts of the prepared template, split around the body content."""
+
+    __slots__ = (
+        "parts",
+        "head",
+        "tail",
+        "sect_pr",
+        "block_width",
+        "style_ids",
+        "rel_ids",
+    )
+
+    def __init__(self, parts, head, tail, block_width, style_ids, rel_ids):
+        self.parts = parts
+        self.head = head
+        self.tail = tail
+        self.sect_pr = tail[: tail.rindex(b"</w:sectPr>") + 11].decode("utf-8")
+        self.block_width = block_width
+        self.style_ids = style_ids
+        self.rel_ids = rel_ids
+
+
+class _Links:
+    """Hyperlink relationships of one document being written.
+
+    Ids are allocated as python-docx does (the lowest free "rIdN") and each
+    url gets a single relationship.
+    """
+
+    def __init__(self, template):
+        self.used = set(template.rel_ids)
+        self.ids = {}
+        self._next = 1
+
+    def rel_id(self, url):
+        rel_id = self.ids.get(url)
+        if rel_id is None:
+            while f"rId{self._next}" in self.used:
+                self._next += 1
+            rel_id = f"rId{self._next}"
+            self.used.add(rel_id)
+            self.ids[url] = rel_id
+        return rel_id
+
+    def rels_xml(self, rels):
+        """The document's rels part with this document's links appended."""
+        if not self.ids:
+            return rels
+        added = "".join(
+            f'<Relationship Id="{rel_id}" Type="{HYPERLINK_RELTYPE}" '
+            f'Target={quoteattr(url)} TargetMode="External"/>'
+            for url, rel_id in self.ids.items()
+        )
+        end = rels.rindex(b"</Relationships>")
+        return rels[:end] + added.encode("utf-8") + rels[end:]
+
+
+_TEMPLATE = None
+
+
+def _get_template():
+    global _TEMPLATE
+    if _TEMPLATE is not None:
+        return _TEMPLATE
+
+    doc = gd.new_document()
+    style_ids = {
+        name: doc.styles[name].style_id
+        for name in ("List Bullet", "List Number", "Table Grid")
+    }
+    for level in (1, 2, 3):
+        style_ids[f"Heading {level}"] = doc.styles[f"Heading {level}"].style_id
+    block_width = doc._block_width
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    with zipfile.ZipFile(buf) as zf:
+        parts = [(name, zf.read(name)) for name in zf.namelist()]
+
+    document_xml = dict(parts)[DOCUMENT_PART]
+    body_start = document_xml.index(b"<w:body>") + len(b"<w:body>")
+    sect_start = document_xml.rindex(b"<w:sectPr")
+    head = document_xml[:body_start]
+    tail = document_xml[sect_start:]
+    rel_ids = [m.decode() for m in _REL_ID_RE.findall(dict(parts)[DOCUMENT_RELS_PART])]
+
+    _TEMPLATE = _Template(parts, head, tail, block_width, style_ids, rel_ids)
+    return _TEMPLATE
+
+
+# ---------------------------------------------------------------------------
+# XML fragments
+# ---------------------------------------------------------------------------
+def _t_xml(text):
+    if len(text.strip()) < len(text):
+        return f'<w:t xml:space="preserve">{escape(text)}</w:t>'
+    return f"<w:t>{escape(text)}</w:t>"
+
+
+def _text_xml(text):
+    """Run content for text, matching python-docx's Run.text setter."""
+    if not text:
+        return ""
+    if "\t" not in text and "\r" not in text and "\n" not in text:
+        return _t_xml(text)
+    out = []
+    for piece in _CONTROL_SPLIT_RE.split(text):
+        if piece == "\t":
+            out.append("<w:tab/>")
+        elif piece in ("\r", "\n"):
+            out.append("<w:br/>")
+        elif piece:
+            out.append(_t_xml(piece))
+    return "".join(out)
+
+
+_CODE_FONT_XML = f'<w:rFonts w:ascii="{gd.CODE_FONT}" w:hAnsi="{gd.CODE_FONT}"/>'
+
+
+def _run_xml(text, bold=False, italic=False, color=None, code=False, link=False):
+    if bold or italic or color is not None or code or link:
+        rpr = "<w:rPr>"
+        if code:
+            rpr += _CODE_FONT_XML
+        if bold:
+            rpr += "<w:b/>"
+        if italic:
+            rpr += "<w:i/>"
+        if link:
+            rpr += '<w:color w:val="%02X%02X%02X"/><w:u w:val="single"/>' % tuple(
+                gd.LINK_COLOR
+            )
+        elif color is not None:
+            rpr += '<w:color w:val="%02X%02X%02X"/>' % tuple(color)
+        rpr += "</w:rPr>"
+    else:
+        rpr = ""
+    return f"<w:r>{rpr}{_text_xml(text)}</w:r>"
+
+
+def _runs_xml(runs, links):
+    out = []
+    link_url = None
+    for r in runs:
+        if r.url != link_url:
+            if link_url is not None:
+                out.append("</w:hyperlink>")
+            if r.url is not None:
+                out.append(f'<w:hyperlink r:id="{links.rel_id(r.url)}">')
+            link_url = r.url
+        link = r.url is not None
+        out.append(_run_xml(r.text, r.bold, r.italic, r.color, r.code, link))
+    if link_url is not None:
+        out.append("</w:hyperlink>")
+    return "".join(out)
+
+
+def _cell_xml(text, tc_pr, links, header=False):
+    runs = gd.cell_runs(text, header)
+    if runs is not None:
+        return f"<w:tc>{tc_pr}<w:p>{_runs_xml(runs, links)}</w:p></w:tc>"
+    if header:
+        run = _run_xml(text, bold=True, color=(0xFF, 0xFF, 0xFF))
+    else:
+        run = _run_xml(text)
+    return f"<w:tc>{tc_pr}<w:p>{run}</w:p></w:tc>"
+
+
+def _p_xml(content, style_id=None):
+    ppr = f'<w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>' if style_id else ""
+    if not ppr and not content:
+        return "<w:p/>"
+    return f"<w:p>{ppr}{content}</w:p>"
+
+
+def _table_xml(block, template, links, repeat_header=None):
+    """XML for a table, or for one chunk of it (see generate_docs.Table).
+
+    Fixed layout with the same column widths as
+    generate_docs.add_table_from_md; ``repeat_header`` defaults to
+    generate_docs.REPEAT_TABLE_HEADER.
+    """
+    num_cols = len(block.header)
+    widths = block.widths or gd.column_widths(block.header, block.rows)
+    col_twips = gd.column_twips(widths, Emu(template.block_width).twips)
+    tc_prs = [f'<w:tcPr><w:tcW w:type="dxa" w:w="{w}"/></w:tcPr>' for w in col_twips]
+
+    out = []
+    if block.opens:
+        if repeat_header is None:
+            repeat_header = gd.REPEAT_TABLE_HEADER
+        out += [
+            "<w:tbl><w:tblPr>",
+            f'<w:tblStyle w:val="{template.style_ids["Table Grid"]}"/>',
+            '<w:tblW w:type="auto" w:w="0"/>',
+            '<w:tblLayout w:type="fixed"/>',
+            '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" '
+            'w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/>',
+            "</w:tblPr><w:tblGrid>",
+            *(f'<w:gridCol w:w="{w}"/>' for w in col_twips),
+            "</w:tblGrid><w:tr>",
+            "<w:trPr><w:tblHeader/></w:trPr>" if repeat_header else "",
+        ]
+        for text, w in zip(block.header, col_twips):
+            hdr_tc_pr = (
+                f'<w:tcPr><w:tcW w:type="dxa" w:w="{w}"/>'
+                f'<w:shd w:val="clear" w:color="auto" w:fill="{gd.HEADER_FILL}"/>'
+                "</w:tcPr>"
+            )
+            out.append(_cell_xml(text, hdr_tc_pr, links, header=True))
+        out.append("</w:tr>")
+
+    for row in block.rows:
+        if len(row) > num_cols:
+            raise IndexError(
+                f"table row has {len(row)} cells but the header has {num_cols}"
+            )
+        out.append("<w:tr>")
+        for text, tc_pr in zip(row, tc_prs):
+            out.append(_cell_xml(text, tc_pr, links))
+        # Cells missing from short rows stay empty, as python-docx leaves them
+        for tc_pr in tc_prs[len(row):]:
+            out.append(f"<w:tc>{tc_pr}<w:p/></w:tc>")
+        out.append("</w:tr>")
+
+    if block.closes:
+        out.append("</w:tbl><w:p/>")  # spacing after table
+    return "".join(out)
+
+
+def block_xml(block, template=None, links=None):
+    """Return the WordprocessingML for one block node.
+
+    Hyperlink relationship ids are allocated from ``links``, the _Links of
+    the document being written (a throwaway one when not given).
+    """
+    template = template or _get_template()
+    if links is None:
+        links = _Links(template)
+    kind = type(block)
+
+    if kind is gd.Paragraph or kind is gd.Note:
+        return _p_xml(_runs_xml(block.runs, links))
+    if kind is gd.ListItem:
+        name = "List Number" if block.kind == gd.NUMBERED else "List Bullet"
+        return _p_xml(_runs_xml(block.runs, links), template.style_ids[name])
+    if kind is gd.Heading:
+        style_id = template.style_ids[f"Heading {block.level}"]
+        return _p_xml(_runs_xml(block.runs, links), style_id)
+    if kind is gd.Table:
+        return _table_xml(block, template, links)
+    if kind is gd.Image:
+        reason = f"{block.path}: the streaming writer does not embed images"
+        return _p_xml(_runs_xml(gd.image_fallback_runs(block, reason), links))
+    if kind is gd.SectionBreak:
+        return f"<w:p><w:pPr>{template.sect_pr}</w:pPr></w:p>"
+    raise TypeError(f"unsupported block: {block!r}")
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+def _write_body(f, blocks, template, links):
+    f.write(template.head)
+    pending = []
+    size = 0
+    for block in blocks:
+        xml = block_xml(block, template, links)
+        pending.append(xml)
+        size += len(xml)
+        if size >= FLUSH_BYTES:
+            f.write("".join(pending).encode("utf-8"))
+            pending.clear()
+            size = 0
+    if pending:
+        f.write("".join(pending).encode("utf-8"))
+    f.write(template.tail)
+
+
+_CORE_DATE_RE = re.compile(rb"(<dcterms:(?:created|modified)\b[^>]*>)[^<]*")
+
+
+def _entry_info(name, date_time, method, level):
+    """ZipInfo for a reproducible entry, as generate_docs._PresetZipWriter."""
+    info = zipfile.ZipInfo(name, date_time)
+    info.create_system = 0
+    info.external_attr = 0
+    info.compress_type = method
+    info._compresslevel = level  # what ZipFile.open(info, "w") deflates at
+    return info
+
+
+def write_docx(
+    source,
+    out,
+    compression=None,
+    table_chunk_bytes=TABLE_CHUNK_BYTES,
+    reproducible=False,
+):
+    """Stream markdown into a .docx.
+
+    ``source`` is anything generate_docs.iter_source_lines accepts (text, a
+    path or an iterable of lines); ``out`` is a path or a writable binary
+    file object. Blocks are rendered and compressed as they are parsed, so
+    only the current block is held in memory; tables are written in chunks
+    of about ``table_chunk_bytes``. ``compression`` names a
+    generate_docs.COMPRESSION_PRESETS entry. A ``reproducible`` write pins
+    timestamps as generate_docs.save_package does; entries keep the
+    template's order, since the document must precede its rels. Written to
+    an unseekable stream the entries carry data descriptors, so the bytes
+    are reproducible but differ from a write to a file.
+    """
+    blocks = gd.iter_blocks(gd.iter_source_lines(source), None, table_chunk_bytes)
+    _write_package(blocks, out, compression, reproducible)
+
+
+def write_bundle(
+    sources,
+    out,
+    compression=None,
+    table_chunk_bytes=TABLE_CHUNK_BYTES,
+    reproducible=False,
+):
+    """Stream several sources into one .docx, each starting a new section.
+
+    The shared parts are written once and the bodies one after another; see
+    write_docx for the arguments and generate_docs.write_bundle.
+    """
+
+    def blocks():
+        for i, source in enumerate(sources):
+            if i:
+                yield gd.SectionBreak()
+            lines = gd.iter_source_lines(source)
+            yield from gd.iter_blocks(lines, None, table_chunk_bytes)
+
+    _write_package(blocks(), out, compression, reproducible)
+
+
+def _write_package(blocks, out, compression, reproducible):
+    template = _get_template()
+    preset = gd.compression_preset(compression)
+    if preset is None:
+        doc_method, doc_level = zipfile.ZIP_DEFLATED, None
+    else:
+        doc_method, doc_level = preset["document"]
+    date_time = stamp = None
+    if reproducible:
+        date_time, stamp = gd.reproducible_timestamps()
+
+    links = _Links(template)
+    # The streamed entry takes the archive's settings; the rest are explicit.
+    # python-docx writes each part's rels right after the part, so the
+    # document's links are all known by the time its rels part comes up.
+    with zipfile.ZipFile(out, "w", doc_method, compresslevel=doc_level) as zf:
+        for name, data in template.parts:
+            if name == DOCUMENT_RELS_PART:
+                data = links.rels_xml(data)
+            elif name == CORE_PROPS_PART and stamp is not None:
+                value = stamp.strftime("%Y-%m-%dT%H:%M:%SZ").encode()
+                data = _CORE_DATE_RE.sub(lambda m: m.group(1) + value, data)
+            if preset is None:
+                method, level = zipfile.ZIP_DEFLATED, None
+            else:
+                method, level = preset[gd.part_kind(name)]
+            entry = name
+            if date_time is not None:
+                entry = _entry_info(name, date_time, method, level)
+            if name == DOCUMENT_PART:
+                with zf.open(entry, "w", force_zip64=True) as f:
+                    _write_body(f, blocks, template, links)
+            else:
+                zf.writestr(entry, data, compress_type=method, compresslevel=level)
+
+
+# ---------------------------------------------------------------------------
+# Comparison harness
+# ---------------------------------------------------------------------------
+def _canonical_parts(docx_bytes):
+    from lxml import etree
+
+    parts = {}
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as zf:
+        for name in zf.namelist():
+            data = zf.read(name)
+            if name.endswith(".xml") or name.endswith(".rels"):
+                data = etree.tostring(etree.fromstring(data), method="c14n")
+            parts[name] = data
+    return parts
+
+
+def compare_backends(source):
+    """Render with both backends; return the part names whose content differs.
+
+    ``source`` is markdown text or a path (it is read once per backend).
+    XML parts are compared after canonicalization, so only differences in
+    meaning (not attribute order or empty-element syntax) are reported.
+    """
+    buf = io.BytesIO()
+    gd.build_doc(source).save(buf)
+    expected = _canonical_parts(buf.getvalue())
+
+    buf = io.BytesIO()
+    write_docx(source, buf)
+    actual = _canonical_parts(buf.getvalue())
+
+    names = sorted(set(expected) | set(actual))
+    return [name for name in names if expected.get(name) != actual.get(name)]
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(gd.OUTPUT_DIR, "*.md")))
+    failed = 0
+    for path in paths:
+        diffs = compare_backends(Path(path))
+        if diffs:
+            failed += 1
+            print(f"DIFF: {path} ({', '.join(diffs)})")
+        else:
+            print(f"OK:   {path}")
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,516 @@
+"""
+Render markdown to .docx over HTTP, for on-demand packets from the web app.
+
+    python serve_docs.py [--port 8765] [--workers N] [--max-pending N]
+                         [--render-timeout SECONDS]
+    python serve_docs.py load [--concurrency 16] [--requests 200] [file.md]
+
+Endpoints:
+
+    POST /render   markdown body (UTF-8) -> .docx bytes
+                   ?filename=NAME.docx sets Content-Disposition;
+                   output is reproducible and its ETag is the sha256
+    GET  /stats    request counts, queue depth and latency percentiles (JSON)
+    GET  /health   200 "ok"
+
+Rendering is CPU-bound, so it runs in a process pool of ``--workers``
+processes. At most that many renders are submitted to the pool at once;
+further requests wait in the service's queue, and once ``--max-pending``
+requests are in flight or queued new ones get 503 with Retry-After instead
+of piling up. A queued request whose client hangs up is dropped before it
+reaches a worker; a render that runs past ``--render-timeout`` gets 504.
+Bodies are plain markdown text, which never embeds images,
+so a request cannot make the service read files. Only the standard library
+and python-docx are needed.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+import traceback
+from collections import Counter, deque
+from urllib.parse import parse_qs, urlsplit
+
+import generate_docs as gd
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 8 * 1024 * 1024
+RENDER_TIMEOUT = 30.0
+# How often a queued request checks whether its client is still there
+QUEUE_POLL_SECONDS = 0.05
+MAX_HEADER_LINES = 100
+LATENCY_SAMPLES = 10_000
+DOCX_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+)
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+def _warm_worker():
+    """Pool initializer: load python-docx and build the template up front."""
+    gd.new_document()
+
+
+def _render_worker(text):
+    """Render markdown text; returns (docx bytes, seconds spent rendering)."""
+    start = time.perf_counter()
+    data = gd.render_bytes(text, cache=gd.SECTION_CACHE, reproducible=True)
+    return data, time.perf_counter() - start
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LatencyStats:
+    """Keeps the most recent samples of each named timing."""
+
+    def __init__(self, max_samples=LATENCY_SAMPLES):
+        self.max_samples = max_samples
+        self.samples = {}
+
+    def add(self, name, seconds):
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.max_samples)
+        self.samples[name].append(seconds)
+
+    def as_dict(self):
+        out = {}
+        for name, samples in self.samples.items():
+            values = sorted(samples)
+            out[name] = {
+                "count": len(values),
+                "mean_ms": round(1000 * sum(values) / len(values), 2),
+                **{
+                    f"p{pct}_ms": round(1000 * percentile(values, pct), 2)
+                    for pct in (50, 90, 95, 99)
+                },
+                "max_ms": round(1000 * values[-1], 2),
+            }
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Render service
+# ---------------------------------------------------------------------------
+class Overloaded(Exception):
+    """Raised when the render queue is full."""
+
+
+class ClientGone(Exception):
+    """Raised when a queued request's client disconnects."""
+
+
+class RenderService:
+    """Bounded front for a process pool of renderers.
+
+    ``workers`` renders run at a time; up to ``max_pending`` requests
+    (running plus waiting) are accepted before new ones are refused.
+    Renders taking longer than ``render_timeout`` seconds are given up on.
+    """
+
+    def __init__(self, workers=None, max_pending=None, render_timeout=None):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.render_timeout = render_timeout or RENDER_TIMEOUT
+        # Spawned, not forked: a forked worker would inherit the listening
+        # socket and any open client connections, which then never see EOF.
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+        self.slots = asyncio.Semaphore(self.workers)
+        self.pending = 0
+        self.running = 0
+        self.statuses = Counter()
+        self.abandoned = 0
+        self.latency = LatencyStats()
+        self.started = time.time()
+
+    async def start(self):
+        """Start every worker and load its template before taking requests."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.pool, time.sleep, 0.1)
+                for _ in range(self.workers)
+            )
+        )
+
+    async def render(self, text, client_gone=None):
+        """Render markdown text in the pool and return the .docx bytes.
+
+        Raises Overloaded when the queue is full, ClientGone when
+        ``client_gone()`` turns true while the request is still queued, and
+        asyncio.TimeoutError when the render takes over render_timeout.
+        """
+        if self.pending >= self.max_pending:
+            raise Overloaded()
+        self.pending += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._acquire_slot(client_gone)
+        except BaseException:
+            self.pending -= 1
+            raise
+        self.latency.add("queue", time.perf_counter() - queued_at)
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.pool, _render_worker, text)
+        except BaseException:
+            self._finished(None)
+            raise
+        # A worker process cannot be interrupted, so a render that times out
+        # keeps its slot until it really finishes and the pool never runs
+        # more than ``workers`` renders.
+        future.add_done_callback(self._finished)
+        data, seconds = await asyncio.wait_for(
+            asyncio.shield(future), self.render_timeout
+        )
+        self.latency.add("render", seconds)
+        return data
+
+    async def _acquire_slot(self, client_gone):
+        # Waiting here rather than in the executor's queue lets a request
+        # whose client has hung up leave the queue without costing a render.
+        while True:
+            try:
+                await asyncio.wait_for(self.slots.acquire(), QUEUE_POLL_SECONDS)
+                return
+            except asyncio.TimeoutError:
+                if client_gone is not None and client_gone():
+                    self.abandoned += 1
+                    raise ClientGone() from None
+
+    def _finished(self, future):
+        self.running -= 1
+        self.pending -= 1
+        self.slots.release()
+        if future is not None and not future.cancelled():
+            future.exception()  # retrieved, even if nobody awaits it anymore
+
+    def stats(self):
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "running": self.running,
+            "queued": self.pending - self.running,
+            "abandoned": self.abandoned,
+            "responses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "latency": self.latency.as_dict(),
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+class BadRequest(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader):
+    """Read one HTTP/1.x request; returns None when the client has gone."""
+    try:
+        request_line = await reader.readline()
+    except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+        return None
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise BadRequest(400, "malformed request line")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        try:
+            line = await reader.readline()
+        except (asyncio.LimitOverrunError, ValueError):
+            raise BadRequest(400, "header line too long")
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise BadRequest(400, "too many headers")
+
+    body = b""
+    if method == "POST":
+        if "content-length" not in headers:
+            raise BadRequest(411, "Content-Length required")
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            raise BadRequest(400, "bad Content-Length")
+        if length < 0:
+            raise BadRequest(400, "bad Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise BadRequest(413, f"body over {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length)
+    return method, target, version, headers, body
+
+
+def write_response(writer, status, body, content_type, keep_alive, headers=()):
+    head = [
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        *(f"{k}: {v}" for k, v in headers),
+    ]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+
+def _text(message):
+    return (message + "\n").encode("utf-8")
+
+
+async def handle_request(service, method, target, body, client_gone=None):
+    """Return (status, body, content type, extra headers) for one request.
+
+    ClientGone from the service is passed on: there is no one to answer.
+    """
+    url = urlsplit(target)
+    if url.path == "/render":
+        if method != "POST":
+            return 405, _text("use POST"), "text/plain", [("Allow", "POST")]
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            return 400, _text("body is not UTF-8"), "text/plain", []
+        try:
+            data = await service.render(text, client_gone)
+        except Overloaded:
+            return 503, _text("render queue full"), "text/plain", [("Retry-After", "1")]
+        except asyncio.TimeoutError:
+            return 504, _text("render timed out"), "text/plain", []
+        except ClientGone:
+            raise
+        except Exception:
+            # Details go to the log, not to the client
+            traceback.print_exc()
+            return 500, _text("render failed"), "text/plain", []
+        extra = [("ETag", f'"{hashlib.sha256(data).hexdigest()}"')]
+        filename = parse_qs(url.query).get("filename")
+        if filename:
+            name = os.path.basename(filename[0]).replace('"', "")
+            extra.append(("Content-Disposition", f'attachment; filename="{name}"'))
+        return 200, data, DOCX_CONTENT_TYPE, extra
+
+    if url.path == "/stats" and method == "GET":
+        data = json.dumps(service.stats(), indent=2).encode("utf-8")
+        return 200, data, "application/json", []
+    if url.path == "/health" and method == "GET":
+        return 200, _text("ok"), "text/plain", []
+    return 404, _text("not found"), "text/plain", []
+
+
+async def handle_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except BadRequest as exc:
+                service.statuses[exc.status] += 1
+                write_response(writer, exc.status, _text(str(exc)), "text/plain", False)
+                break
+            except asyncio.IncompleteReadError:
+                break
+            if request is None:
+                break
+
+            method, target, version, headers, body = request
+            start = time.perf_counter()
+            try:
+                status, data, content_type, extra = await handle_request(
+                    service, method, target, body, reader.at_eof
+                )
+            except ClientGone:
+                break
+            connection = headers.get("connection", "").lower()
+            keep_alive = (
+                connection != "close"
+                if version == "HTTP/1.1"
+                else connection == "keep-alive"
+            )
+            write_response(writer, status, data, content_type, keep_alive, extra)
+            await writer.drain()
+            service.statuses[status] += 1
+            if status == 200 and urlsplit(target).path == "/render":
+                service.latency.add("request", time.perf_counter() - start)
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port, workers=None, max_pending=None, render_timeout=None):
+    service = RenderService(workers, max_pending, render_timeout)
+    try:
+        await service.start()
+        server = await asyncio.start_server(
+            lambda r, w: handle_connection(service, r, w), host, port
+        )
+        print(
+            f"Serving on http://{host}:{port} ({service.workers} workers, "
+            f"max {service.max_pending} pending, "
+            f"{service.render_timeout:g}s render timeout)"
+        )
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+# ---------------------------------------------------------------------------
+# Load test client
+# ---------------------------------------------------------------------------
+async def _post(host, port, path, body):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            (
+                f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Type: text/markdown; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+            ).encode("latin-1")
+            + body
+        )
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        await reader.read()
+        return status
+    finally:
+        writer.close()
+
+
+async def load_test(host, port, body, requests, concurrency):
+    """POST body to /render ``requests`` times with ``concurrency`` clients."""
+    latencies = []
+    statuses = Counter()
+    remaining = iter(range(requests))
+
+    async def client():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status = await _post(host, port, "/render", body)
+            except OSError:
+                status = "error"
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{requests} requests, concurrency {concurrency}, {wall:.2f}s")
+    print(f"  throughput {len(latencies) / wall:.1f} docs/s")
+    print(f"  statuses   {dict(statuses)}")
+    if latencies:
+        print(
+            "  latency    "
+            + ", ".join(
+                f"p{pct} {1000 * percentile(latencies, pct):.0f} ms"
+                for pct in (50, 90, 99)
+            )
+        )
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+def main(argv=None):
+    import argparse
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0].startswith("-") and argv[0] not in ("-h", "--help"):
+        argv = ["serve", *argv]
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = commands.add_parser("serve", help="run the render service")
+    serve_cmd.add_argument("--host", default=DEFAULT_HOST)
+    serve_cmd.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_cmd.add_argument(
+        "--workers", type=int, help="render processes (default: CPU count)"
+    )
+    serve_cmd.add_argument(
+        "--max-pending",
+        type=int,
+        help="running + queued renders before 503 (default: 4 per worker)",
+    )
+    serve_cmd.add_argument(
+        "--render-timeout",
+        type=float,
+        help=f"seconds before a render gets 504 (default: {RENDER_TIMEOUT:g})",
+    )
+
+    load_cmd = commands.add_parser("load", help="load-test a running service")
+    load_cmd.add_argument("source", nargs="?", help="markdown file to send")
+    load_cmd.add_argument("--host", default=DEFAULT_HOST)
+    load_cmd.add_argument("--port", type=int, default=DEFAULT_PORT)
+    load_cmd.add_argument("--requests", type=int, default=200)
+    load_cmd.add_argument("--concurrency", type=int, default=16)
+
+    args = parser.parse_args(argv)
+    if args.command == "load":
+        source = args.source or gd.DOCUMENTS[0][0]
+        with open(source, "rb") as f:
+            body = f.read()
+        asyncio.run(
+            load_test(args.host, args.port, body, args.requests, args.concurrency)
+        )
+        return 0
+
+    try:
+        options = (args.workers, args.max_pending, args.render_timeout)
+        asyncio.run(serve(args.host, args.port, *options))
+    except KeyboardInterrupt:
+        print("Stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())